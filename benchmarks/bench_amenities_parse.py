@@ -0,0 +1,69 @@
+"""
+Times the eval-based amenities count that compute_metrics used against
+parse_amenities on a city-sized amenities column and checks the counts agree, plus
+that null list items are dropped rather than mapped to another row's amenity.
+Pass an InsideAirbnb listings.csv(.gz) to run on a real city file instead of
+synthetic data.
+
+    python benchmarks/bench_amenities_parse.py [listings.csv.gz]
+"""
+from __future__ import annotations
+import json
+import sys
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.amenities import parse_amenities
+from src.amenity_index import AmenityIndex
+
+def legacy_count(series: pd.Series) -> pd.Series:
+    def count(x):
+        if pd.isnull(x):
+            return 0
+        if isinstance(x, str) and x.strip().startswith("["):
+            try:
+                return len(eval(x))
+            except Exception:
+                return 0
+        return 0
+    return series.apply(count)
+
+def synthetic_amenities(n: int = 90_000, seed: int = 3) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    vocab = [f"Amenity {i}" for i in range(1500)] + ["Wifi", "Kitchen", "Hair dryer – ionic", 'TV with "Netflix"']
+    weights = 1.0 / np.arange(1, len(vocab) + 1)
+    weights /= weights.sum()
+    sizes = rng.integers(0, 80, n)
+    return pd.Series([json.dumps(list(rng.choice(vocab, k, replace=False, p=weights))) for k in sizes])
+
+def check_null_items() -> int:
+    parsed = parse_amenities(pd.Series(['["Wifi", null, "TV"]', '["Kitchen"]', '["Pool", NaN]']))
+    names = [[parsed.vocab[c] for c in parsed.codes[a:b]] for a, b in zip(parsed.offsets[:-1], parsed.offsets[1:])]
+    ok = names[0] == ["wifi", "tv"] and list(parsed.counts) == [2, 1, 1]
+    print(f"null items dropped: {'OK' if ok else 'FAILED ' + repr(names)}")
+    return 0 if ok else 1
+
+def main(path: str | None = None):
+    if path:
+        amenities = pd.read_csv(path, usecols=["amenities"])["amenities"]
+    else:
+        amenities = synthetic_amenities()
+    t0 = time.perf_counter()
+    old = legacy_count(amenities)
+    t1 = time.perf_counter()
+    parsed = parse_amenities(amenities)
+    t2 = time.perf_counter()
+    AmenityIndex(parsed)
+    t3 = time.perf_counter()
+    mismatches = int((old.to_numpy() != parsed.counts).sum())
+    print(f"rows={len(amenities):,} vocab={len(parsed.vocab):,} tokens={len(parsed.codes):,}")
+    print(f"eval count={t1 - t0:.2f}s parse_amenities={t2 - t1:.2f}s index build={t3 - t2:.2f}s "
+          f"count mismatches={mismatches}")
+    return mismatches + check_null_items()
+
+if __name__ == "__main__":
+    sys.exit(1 if main(sys.argv[1] if len(sys.argv) > 1 else None) else 0)
@@ -0,0 +1,47 @@
+"""
+Times run_analysis (train -> cluster -> score) on a full synthetic snapshot,
+cold (empty model registry) and warm (same snapshot again), against the
+ANALYSIS_BUDGET_SECONDS target. Registry files go to a temporary directory.
+
+    python benchmarks/bench_analysis_pipeline.py [rows]
+"""
+from __future__ import annotations
+import os
+import sys
+import tempfile
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+def synthetic_snapshot(n: int, seed: int = 5) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "id": np.arange(n),
+        "name": [f"Listing {i}" for i in range(n)],
+        "room_type": rng.choice(["Entire home/apt", "Private room", "Shared room"], n),
+        "latitude": 51.5 + rng.normal(0, 0.08, n),
+        "longitude": -0.1 + rng.normal(0, 0.12, n),
+        "price": rng.lognormal(4.8, 0.7, n).round(0),
+        "number_of_reviews": rng.negative_binomial(1, 0.03, n).astype(float),
+        "review_scores_rating": rng.uniform(60, 100, n).round(1),
+        "availability_365": rng.integers(0, 366, n).astype(float),
+        "amenities_count": rng.integers(0, 60, n).astype(float),
+    })
+
+def main(n: int = 100_000) -> bool:
+    os.chdir(tempfile.mkdtemp())
+    from src.pipelines.analysis import run_analysis, ANALYSIS_BUDGET_SECONDS
+    df = synthetic_snapshot(n)
+    ok = True
+    for label in ("cold", "warm"):
+        out, timings = run_analysis(df.copy(), city="bench-city", date="2025-01-01")
+        within = timings["total"] <= ANALYSIS_BUDGET_SECONDS
+        ok &= within or label == "cold"
+        print(f"{label}: rows={len(out):,} " + " ".join(f"{k}={v:.2f}s" for k, v in timings.items())
+              + f" budget={ANALYSIS_BUDGET_SECONDS:.1f}s {'ok' if within else 'OVER'}")
+    return ok
+
+if __name__ == "__main__":
+    sys.exit(0 if main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000) else 1)
@@ -0,0 +1,158 @@
+"""
+Runs download_dataset against a local http.server stand-in for InsideAirbnb and
+checks the transfer paths: a full download, a download cut off mid-body and resumed
+with Range / If-Range, a server that ignores Range (restart from zero), a 304
+revalidation of the cached copy, an ETag checksum mismatch being rejected, and a
+plain .csv URL on a server that gzip-encodes responses when the client accepts it.
+
+    python benchmarks/bench_downloader.py [size_kb]
+"""
+from __future__ import annotations
+import gzip
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("NO_PROXY", "127.0.0.1,localhost")
+
+import src.downloader as downloader
+from src.scraper import DatasetVersion
+
+class StandIn:
+    """What the server serves and how it misbehaves; handlers read it, checks reset it."""
+    body = b""
+    etag = ""
+    cut_first_at = None  # send only this many body bytes on the next full response
+    honor_range = True
+    encode = False  # Content-Encoding: gzip whenever Accept-Encoding allows it
+    requests = []
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        body, etag = StandIn.body, StandIn.etag
+        StandIn.requests.append(dict(self.headers))
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if StandIn.encode and "gzip" in self.headers.get("Accept-Encoding", ""):
+            payload = gzip.compress(body)
+            self.send_response(200)
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+        rng = self.headers.get("Range")
+        if rng and StandIn.honor_range and self.headers.get("If-Range", etag) == etag:
+            start = int(rng.split("=")[1].split("-")[0])
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+            payload = body[start:]
+        else:
+            self.send_response(200)
+            payload = body
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if StandIn.cut_first_at is not None and len(payload) == len(body):
+            self.wfile.write(payload[:StandIn.cut_first_at])
+            StandIn.cut_first_at = None
+            self.close_connection = True
+            return
+        self.wfile.write(payload)
+
+def make_body(size_kb: int) -> bytes:
+    # random hex names barely compress, so the gzip body is roughly size_kb
+    names = os.urandom(size_kb * 512).hex()
+    rows = "\n".join(f"{i},{names[i * 64:(i + 1) * 64]},{(i * 7919) % 500}" for i in range(len(names) // 64))
+    return gzip.compress(("id,name,price\n" + rows).encode(), compresslevel=1)
+
+def reset(body: bytes, etag: str = None, cut_first_at=None, honor_range=True, encode=False) -> None:
+    StandIn.body = body
+    StandIn.etag = etag or f'"{hashlib.md5(body).hexdigest()}"'
+    StandIn.cut_first_at = cut_first_at
+    StandIn.honor_range = honor_range
+    StandIn.encode = encode
+    StandIn.requests = []
+
+def fetch(url: str, date: str, force: bool = False):
+    version = DatasetVersion(date, url, None, None, None)
+    return downloader.download_dataset(version, city="standin", date=date, force=force,
+                                       max_retries=3, backoff_base=1.0, allow_cached_if_blocked=False)
+
+def main(size_kb: int) -> int:
+    downloader.RAW_DIR = Path(tempfile.mkdtemp(prefix="standin_raw_"))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/listings.csv.gz"
+    body = make_body(size_kb)
+    failures = []
+
+    def check(name: str, ok: bool, t0: float) -> None:
+        print(f"  {name:<26} {time.perf_counter() - t0:6.2f}s   {'OK' if ok else 'FAILED'}")
+        if not ok:
+            failures.append(name)
+
+    def same(out) -> bool:
+        return out["listings"] is not None and out["listings"].read_bytes() == body
+
+    print(f"{len(body)} byte gzip body")
+    try:
+        t0 = time.perf_counter()
+        reset(body)
+        out = fetch(url, "full")
+        meta = downloader.read_cache_meta(out["listings"])
+        check("full download", same(out) and meta.get("sha256") == hashlib.sha256(body).hexdigest(), t0)
+
+        t0 = time.perf_counter()
+        reset(body, cut_first_at=len(body) // 3)
+        out = fetch(url, "resume")
+        ranged = [h for h in StandIn.requests if "Range" in h]
+        check("resumed partial download", same(out) and len(ranged) == 1 and "If-Range" in ranged[0], t0)
+
+        t0 = time.perf_counter()
+        reset(body, cut_first_at=len(body) // 3, honor_range=False)
+        out = fetch(url, "norange")
+        retried = StandIn.requests[1:]
+        check("server ignoring Range", same(out) and len(retried) == 1 and "Range" in retried[0], t0)
+
+        t0 = time.perf_counter()
+        reset(body)
+        out = fetch(url, "full", force=True)
+        check("304 revalidation", same(out) and len(StandIn.requests) == 1, t0)
+
+        t0 = time.perf_counter()
+        reset(body, etag='"' + "0" * 32 + '"')
+        try:
+            fetch(url, "badsum")
+            rejected = False
+        except RuntimeError:
+            rejected = not list(downloader.RAW_DIR.glob("standin_badsum_*"))
+        check("ETag checksum mismatch", rejected, t0)
+
+        t0 = time.perf_counter()
+        plain = gzip.decompress(body)
+        reset(plain, encode=True)
+        out = fetch(url[: -len(".gz")], "encoded")
+        ok = out["listings"] is not None and out["listings"].read_bytes() == plain
+        check("encoding-happy server", ok and out["listings"].suffix == ".csv", t0)
+    finally:
+        server.shutdown()
+    return len(failures)
+
+if __name__ == "__main__":
+    sys.exit(1 if main(int(sys.argv[1]) if len(sys.argv) > 1 else 512) else 0)
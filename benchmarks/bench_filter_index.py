@@ -0,0 +1,92 @@
+"""
+Compares filter_by_preferences with and without a prebuilt ListingFilterIndex
+at several frame sizes and checks both return the same rows, also for an index
+built without amenities (required_amenities then builds its AmenityIndex once).
+
+    python benchmarks/bench_filter_index.py [rows ...]
+"""
+from __future__ import annotations
+import sys
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.filter_index import ListingFilterIndex
+from src.recommendation import filter_by_preferences
+
+ROOM_TYPES = ["Entire home/apt", "Private room", "Shared room", "Hotel room"]
+AMENITY_LISTS = [
+    ["Wifi", "Kitchen", "Washer"], ["Wifi", "Kitchen"], ["wifi", "Pool", "Kitchen "],
+    ["Kitchen", "Heating"], ["Wifi"], [], ["Wifi", "Heating", "Washer", "Kitchen"],
+]
+
+FILTERS = dict(
+    price_range=(40.0, 220.0),
+    reviews_range=(5, 400),
+    stars_range=(4.0, 5.0),
+    availability_range=(30, 300),
+    occupancy_group="Small group (3-4)",
+    room_types=["Entire home/apt", "Private room"],
+    required_amenities=["wifi", "Kitchen"],
+    min_amenities_count=10,
+    max_price_per_person=60.0,
+)
+
+def synthetic_listings(n: int, seed: int = 11) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "id": np.arange(n),
+        "price": rng.lognormal(4.8, 0.7, n).round(0),
+        "number_of_reviews": rng.negative_binomial(1, 0.03, n).astype(float),
+        "review_scores_rating": rng.uniform(60, 100, n).round(1),
+        "availability_365": rng.integers(0, 366, n).astype(float),
+        "accommodates": rng.integers(1, 9, n).astype(float),
+        "amenities_count": rng.integers(0, 60, n).astype(float),
+        "room_type": rng.choice(ROOM_TYPES, n),
+        "amenities_list": [AMENITY_LISTS[i] for i in rng.integers(0, len(AMENITY_LISTS), n)],
+        "description": ["lorem ipsum " * 8] * n,
+    })
+    for col in ["price", "number_of_reviews", "review_scores_rating", "accommodates"]:
+        df.loc[rng.random(n) < 0.04, col] = np.nan
+    return df
+
+def _best_of(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def main(sizes):
+    ok = True
+    for n in sizes:
+        df = synthetic_listings(n)
+        t0 = time.perf_counter()
+        index = ListingFilterIndex(df)
+        build = time.perf_counter() - t0
+        old = filter_by_preferences(df, **FILTERS)
+        new = filter_by_preferences(df, filter_index=index, **FILTERS)
+        lazy = filter_by_preferences(df, filter_index=ListingFilterIndex(df, build_amenities=False), **FILTERS)
+        same = old["id"].tolist() == new["id"].tolist() == lazy["id"].tolist()
+        ok &= same
+        t_old = _best_of(lambda: filter_by_preferences(df, **FILTERS))
+        t_new = _best_of(lambda: index.query(
+            price_range=FILTERS["price_range"], reviews_range=FILTERS["reviews_range"],
+            rating_range=(80.0, 100.0), availability_range=FILTERS["availability_range"],
+            accommodates_range=(3, 4), room_types=FILTERS["room_types"],
+            required_amenities=FILTERS["required_amenities"],
+            min_amenities_count=FILTERS["min_amenities_count"],
+            max_price_per_person=FILTERS["max_price_per_person"],
+        ))
+        print(f"rows={n:>9,} matches={len(new):>7,} build={build * 1000:8.1f}ms "
+              f"frame_filter={t_old * 1000:8.1f}ms index_query={t_new * 1000:7.2f}ms "
+              f"speedup={t_old / max(t_new, 1e-9):6.0f}x same={same}")
+    return ok
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    sys.exit(0 if main(sizes) else 1)
@@ -0,0 +1,88 @@
+"""
+Checks the vectorized recommendation_reason builder against the original
+iterrows loop on a synthetic city-sized frame and times both.
+
+    python benchmarks/bench_recommendation_reasons.py [rows]
+"""
+from __future__ import annotations
+import math
+import sys
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.recommendation import _build_reasons
+
+def legacy_reasons(df: pd.DataFrame, reviews_col):
+    reasons = []
+    for _, row in df.iterrows():
+        r_parts = []
+        if "predicted_price" in row and "price" in row and not math.isnan(row["price"]):
+            diff = row["predicted_price"] - row["price"]
+            pct = diff / row["price"] * 100 if row["price"] else 0
+            if pct > 8:
+                r_parts.append(f"~{pct:.0f}% undervalued")
+            elif pct < -8:
+                r_parts.append(f"{abs(pct):.0f}% premium")
+        rev_c = reviews_col
+        if rev_c and row.get(rev_c, 0) > 50:
+            r_parts.append(f"{int(row[rev_c])} reviews")
+        elif rev_c and row.get(rev_c, 0) > 10:
+            r_parts.append("solid reviews")
+        if "review_scores_rating" in row and not math.isnan(row["review_scores_rating"]):
+            if row["review_scores_rating"] >= 95:
+                r_parts.append("excellent rating")
+            elif row["review_scores_rating"] >= 90:
+                r_parts.append("strong rating")
+        if "amenities_count" in row:
+            if row["amenities_count"] >= 20:
+                r_parts.append("rich amenities")
+            elif row["amenities_count"] >= 10:
+                r_parts.append("good amenities")
+        if "availability_365" in row:
+            av = row["availability_365"]
+            if 60 <= av <= 250:
+                r_parts.append("balanced availability")
+            elif av < 30:
+                r_parts.append("limited availability")
+        if not r_parts:
+            r_parts = ["meets criteria"]
+        reasons.append("; ".join(r_parts))
+    return reasons
+
+def synthetic_listings(n: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    price = rng.lognormal(4.8, 0.7, n).round(0)
+    price[rng.random(n) < 0.03] = np.nan
+    price[rng.random(n) < 0.01] = 0
+    df = pd.DataFrame({
+        "id": np.arange(n),
+        "price": price,
+        "predicted_price": price * rng.normal(1.0, 0.2, n),
+        "number_of_reviews": rng.negative_binomial(1, 0.03, n).astype(float),
+        "review_scores_rating": rng.uniform(60, 100, n).round(1),
+        "amenities_count": rng.integers(0, 60, n).astype(float),
+        "availability_365": rng.integers(0, 366, n).astype(float),
+    })
+    for col in ["number_of_reviews", "review_scores_rating", "amenities_count", "availability_365"]:
+        df.loc[rng.random(n) < 0.05, col] = np.nan
+    return df
+
+def main(n: int = 90_000):
+    df = synthetic_listings(n)
+    t0 = time.perf_counter()
+    old = legacy_reasons(df, "number_of_reviews")
+    t1 = time.perf_counter()
+    new = _build_reasons(df, "number_of_reviews")
+    t2 = time.perf_counter()
+    mismatches = int(sum(a != b for a, b in zip(old, new)))
+    print(f"rows={n} iterrows={t1 - t0:.2f}s vectorized={t2 - t1:.3f}s "
+          f"speedup={(t1 - t0) / max(t2 - t1, 1e-9):.0f}x mismatches={mismatches}")
+    return mismatches
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 90_000
+    sys.exit(1 if main(rows) else 0)
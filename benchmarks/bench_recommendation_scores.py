@@ -0,0 +1,62 @@
+"""
+Times build_recommendation_scores on a synthetic city-sized frame and checks the
+edge cases it has to survive: a price-only frame (Direct CSV / scraper sources)
+scores all zeros, and a compacted frame (int16 availability / amenities) scores the
+same as the uncompacted one.
+
+    python benchmarks/bench_recommendation_scores.py [rows]
+"""
+from __future__ import annotations
+import sys
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.listing_schema import compact_listings
+from src.recommendation import build_recommendation_scores
+
+SCORE_COLUMNS = ["score_price_value", "score_review_quality", "score_amenities", "score_availability", "total_score"]
+
+def synthetic_listings(n: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    price = rng.lognormal(4.8, 0.7, n).round(0)
+    price[:3] = 50_000  # outliers
+    return pd.DataFrame({
+        "id": np.arange(n),
+        "price": price,
+        "predicted_price": price * rng.normal(1.0, 0.2, n),
+        "number_of_reviews": rng.negative_binomial(1, 0.03, n),
+        "review_scores_rating": rng.uniform(60, 100, n).round(1),
+        "amenities_count": rng.integers(0, 60, n),
+        "availability_365": rng.integers(0, 366, n),
+    })
+
+def check_price_only() -> list:
+    df = pd.DataFrame({"id": [1, 2, 3], "name": ["a", "b", "c"], "price": [80.0, 120.0, 95.0]})
+    out = build_recommendation_scores(df)
+    return [] if np.allclose(out[SCORE_COLUMNS].to_numpy(dtype=float), 0) else ["price-only frame"]
+
+def check_compacted(df: pd.DataFrame) -> list:
+    compact, _ = compact_listings(df)
+    a = build_recommendation_scores(df)[SCORE_COLUMNS].to_numpy(dtype=float)
+    b = build_recommendation_scores(compact)[SCORE_COLUMNS].to_numpy(dtype=float)
+    return [] if np.allclose(a, b, atol=1e-4, equal_nan=True) else ["compacted frame scores differ"]
+
+def main(n: int = 90_000) -> int:
+    failures = check_price_only()
+    df = synthetic_listings(n)
+    t0 = time.perf_counter()
+    out = build_recommendation_scores(df)
+    elapsed = time.perf_counter() - t0
+    failures += check_compacted(df)
+    scores = out[SCORE_COLUMNS[1:-1]].to_numpy(dtype=float)
+    if np.nanmin(scores) < 0 or np.nanmax(scores) > 1:
+        failures.append("normalized scores outside [0, 1]")
+    print(f"rows={n} score={elapsed:.3f}s checks={'OK' if not failures else 'FAILED ' + ', '.join(failures)}")
+    return len(failures)
+
+if __name__ == "__main__":
+    sys.exit(1 if main(int(sys.argv[1]) if len(sys.argv) > 1 else 90_000) else 0)
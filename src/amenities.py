@@ -0,0 +1,111 @@
+from __future__ import annotations
+import json
+import re
+from dataclasses import dataclass
+from itertools import chain
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+
+# Fallback tokenizer for bracketed strings that are not valid JSON: "double quoted"
+# (with escapes), 'single quoted' (stringified Python list) or a bare value ({TV,Internet}).
+_TOKEN_RE = re.compile(r'\s*(?:"((?:[^"\\]|\\.)*)"|\'((?:[^\'\\]|\\.)*)\'|([^,]+))')
+
+@dataclass
+class ParsedAmenities:
+    """
+    Amenities of every row in flat form: row i owns codes[offsets[i]:offsets[i + 1]],
+    each an index into the sorted, lowercased `vocab`. `counts` is the number of
+    amenities listed per row (the amenities_count column).
+    """
+    counts: np.ndarray
+    offsets: np.ndarray
+    codes: np.ndarray
+    vocab: List[str]
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def row_ids(self) -> np.ndarray:
+        return np.repeat(np.arange(len(self.counts)), np.diff(self.offsets))
+
+    def lists(self) -> List[List[str]]:
+        vocab = np.asarray(self.vocab, dtype=object)
+        names = vocab[self.codes] if len(self.codes) else np.empty(0, dtype=object)
+        return [list(names[a:b]) for a, b in zip(self.offsets[:-1], self.offsets[1:])]
+
+def _unescape(tok: str) -> str:
+    try:
+        return json.loads(f'"{tok}"')
+    except ValueError:
+        return tok
+
+def _tokenize(text: str) -> List[str]:
+    out = []
+    for dq, sq, bare in _TOKEN_RE.findall(text[1:-1]):
+        tok = dq or sq or bare
+        out.append(_unescape(tok) if "\\" in tok else tok)
+    return out
+
+def _load_json_lists(texts: List[str]) -> List[List]:
+    # One json.loads over all rows joined into a single array; rows are only parsed
+    # one by one (and tokenized on failure) when the batch is not valid JSON.
+    try:
+        lists = json.loads("[" + ",".join(texts) + "]")
+        if len(lists) == len(texts) and all(isinstance(x, list) for x in lists):
+            return lists
+    except ValueError:
+        pass
+    out = []
+    for t in texts:
+        try:
+            x = json.loads(t)
+        except ValueError:
+            x = None
+        out.append(x if isinstance(x, list) else _tokenize(t))
+    return out
+
+def parse_amenities(values: pd.Series, plain_sep: Optional[str] = None) -> ParsedAmenities:
+    """
+    Vectorized, eval-free amenities parser. Accepts InsideAirbnb JSON strings
+    ('["Wifi", "Kitchen"]'), the older '{TV,"Cable TV"}' form, stringified Python
+    lists and real lists. Other strings are split on the `plain_sep` regex when
+    given (scraped "wifi, kitchen | washer" text) and count as no amenities otherwise.
+    Names are stripped and lowercased once per distinct raw name, not per token.
+    """
+    values = list(values)
+    n = len(values)
+    lists: List = [()] * n
+    json_rows, json_texts = [], []
+    plain = re.compile(plain_sep) if plain_sep is not None else None
+    for i, v in enumerate(values):
+        if isinstance(v, (list, tuple, set, np.ndarray)):
+            lists[i] = list(v)
+        elif isinstance(v, str):
+            t = v.strip()
+            if t.startswith("[") and t.endswith("]"):
+                json_rows.append(i)
+                json_texts.append(t)
+            elif t.startswith("{") and t.endswith("}"):
+                lists[i] = _tokenize(t)
+            elif plain is not None:
+                lists[i] = plain.split(t)
+    for i, lst in zip(json_rows, _load_json_lists(json_texts)):
+        lists[i] = lst
+
+    lens = np.fromiter(map(len, lists), dtype=np.int64, count=n)
+    raw_codes, raw_names = pd.factorize(pd.Series(list(chain.from_iterable(lists)), dtype=object))
+    norm = [str(x).strip().lower() for x in raw_names]
+    norm_codes, vocab = pd.factorize(pd.Series(norm, dtype=object), sort=True)
+    if "" in vocab:
+        empty = vocab.get_loc("")
+        norm_codes = np.where(norm_codes == empty, -1, norm_codes - (norm_codes > empty))
+        vocab = vocab.delete(empty)
+    # factorize codes null / NaN items -1; indexing norm_codes with it would pick the last name
+    codes = np.where(raw_codes < 0, -1, norm_codes[raw_codes]) if len(raw_codes) else np.empty(0, dtype=np.int64)
+    rows = np.repeat(np.arange(n), lens)
+    keep = codes >= 0
+    codes, rows = codes[keep], rows[keep]
+    counts = np.bincount(rows, minlength=n)
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    return ParsedAmenities(counts=counts, offsets=offsets, codes=codes.astype(np.int32), vocab=list(vocab))
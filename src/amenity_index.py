@@ -0,0 +1,94 @@
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional, Union
+import numpy as np
+import pandas as pd
+from src.amenities import ParsedAmenities, parse_amenities
+
+# Amenities held by at least this share of rows are stored as packed bitsets,
+# rarer ones as sorted int32 position arrays (smaller than a bitset below 1/32).
+DENSE_FRACTION = 1 / 32
+
+Posting = Union[np.ndarray, "_Bitset"]
+
+class _Bitset:
+    def __init__(self, positions: np.ndarray, n_rows: int):
+        mask = np.zeros(n_rows, dtype=bool)
+        mask[positions] = True
+        self.bits = np.packbits(mask)
+        self.n_rows = n_rows
+
+    def contains(self, positions: np.ndarray) -> np.ndarray:
+        return ((self.bits[positions >> 3] >> (7 - (positions & 7))) & 1).astype(bool)
+
+    def positions(self) -> np.ndarray:
+        return np.flatnonzero(np.unpackbits(self.bits, count=self.n_rows))
+
+class AmenityIndex:
+    """
+    Amenity vocabulary (lowercased names) with an inverted index from amenity to the
+    row positions that list it, built once per loaded frame. Matching several
+    amenities is an intersection of postings instead of a per-row set scan, and
+    `frequencies()` gives the ranked amenity list without touching the data again.
+    """
+
+    def __init__(self, parsed: ParsedAmenities):
+        self.n_rows = len(parsed)
+        self.vocab: List[str] = list(parsed.vocab)
+        self._code: Dict[str, int] = {a: i for i, a in enumerate(self.vocab)}
+        # one (amenity, row) pair per listing even if a name is repeated in its list
+        pairs = np.sort(parsed.codes.astype(np.int64) * max(self.n_rows, 1) + parsed.row_ids())
+        pairs = pairs[np.concatenate([[True], pairs[1:] != pairs[:-1]])] if len(pairs) else pairs
+        codes, rows = pairs // max(self.n_rows, 1), pairs % max(self.n_rows, 1)
+        self.counts = np.bincount(codes, minlength=len(self.vocab))
+        bounds = np.concatenate([[0], np.cumsum(self.counts)])
+        dense_at = self.n_rows * DENSE_FRACTION
+        self._postings: List[Posting] = []
+        for i in range(len(self.vocab)):
+            pos = rows[bounds[i]:bounds[i + 1]].astype(np.int32)
+            self._postings.append(_Bitset(pos, self.n_rows) if len(pos) >= dense_at else pos)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> Optional["AmenityIndex"]:
+        """Builds from `amenities_list` (lists) or the InsideAirbnb `amenities` JSON column."""
+        col = next((c for c in ["amenities_list", "amenities"] if c in df.columns), None)
+        if col is None:
+            return None
+        return cls(parse_amenities(df[col]))
+
+    def __len__(self) -> int:
+        return len(self.vocab)
+
+    def frequencies(self, top: Optional[int] = None) -> pd.Series:
+        """Listing count per amenity, most common first."""
+        s = pd.Series(self.counts, index=self.vocab, name="listings").sort_values(ascending=False, kind="stable")
+        return s.head(top) if top else s
+
+    def filter(self, candidates: np.ndarray, amenities: Iterable[str]) -> np.ndarray:
+        """Keeps the (sorted) candidate positions whose listing has every amenity."""
+        postings = []
+        for a in amenities:
+            code = self._code.get(a.strip().lower())
+            if code is None:
+                return candidates[:0]
+            postings.append(self._postings[code])
+        # sparse position arrays first: they shrink the candidate set the most
+        postings.sort(key=lambda p: 1 if isinstance(p, _Bitset) else 0)
+        for p in postings:
+            if len(candidates) == 0:
+                break
+            if isinstance(p, _Bitset):
+                candidates = candidates[p.contains(candidates)]
+            else:
+                candidates = np.intersect1d(candidates, p, assume_unique=True)
+        return candidates
+
+    def rows_with_all(self, amenities: Iterable[str]) -> np.ndarray:
+        """Sorted row positions of listings that have every amenity (case-insensitive)."""
+        amenities = list(amenities)
+        codes = [self._code.get(a.strip().lower()) for a in amenities]
+        if not amenities or any(c is None for c in codes):
+            return np.arange(self.n_rows) if not amenities else np.empty(0, dtype=np.int64)
+        rarest = min(codes, key=lambda c: self.counts[c])
+        start = self._postings[rarest]
+        start = start.positions() if isinstance(start, _Bitset) else start.astype(np.int64)
+        return self.filter(start, amenities)
@@ -1,14 +1,62 @@
 from __future__ import annotations
 import pandas as pd
 from src.utils.safe_io import safe_read_listings, FileFormatError
+from src.utils.text import basic_sentiment_placeholder
+from src.amenities import parse_amenities
+from src.listing_schema import parse_currency
+
+REVIEWS_CHUNK_ROWS = 250_000
+DAYS_PER_MONTH = 30.44
+_REVIEW_FOLD = {"num_reviews": "sum", "first_date": "min", "last_date": "max", "sentiment_sum": "sum"}
+
+def aggregate_reviews(
+    reviews_p,
+    chunksize: int = REVIEWS_CHUNK_ROWS,
+    with_comments: bool = False
+) -> pd.DataFrame:
+    """
+    Streams a reviews CSV in chunks (only listing_id, date and optionally comments)
+    and keeps running per-listing aggregates, so peak memory depends on the chunk
+    size and the number of listings rather than on the file size.
+    Returns a frame indexed by listing_id with num_reviews, last_review_date,
+    reviews_per_month_est (and avg_review_sentiment when with_comments).
+    """
+    wanted = {"listing_id", "date"} | ({"comments"} if with_comments else set())
+    acc = None
+    for chunk in pd.read_csv(reviews_p, usecols=lambda c: c in wanted, chunksize=chunksize):
+        if "listing_id" not in chunk.columns:
+            raise ValueError("Reviews file has no listing_id column")
+        part = pd.DataFrame({"listing_id": chunk["listing_id"], "num_reviews": 1})
+        dates = pd.to_datetime(chunk["date"], errors="coerce") if "date" in chunk.columns else pd.NaT
+        part["first_date"] = dates
+        part["last_date"] = dates
+        if with_comments and "comments" in chunk.columns:
+            part["sentiment_sum"] = chunk["comments"].fillna("").astype(str).map(basic_sentiment_placeholder)
+        fold = {k: v for k, v in _REVIEW_FOLD.items() if k in part.columns}
+        part = part.groupby("listing_id").agg(fold)
+        acc = part if acc is None else pd.concat([acc, part]).groupby(level=0).agg(fold)
+    if acc is None:
+        return pd.DataFrame(columns=["num_reviews", "last_review_date", "reviews_per_month_est"])
+
+    out = pd.DataFrame(index=acc.index)
+    out["num_reviews"] = acc["num_reviews"]
+    out["last_review_date"] = acc["last_date"]
+    months = ((acc["last_date"] - acc["first_date"]).dt.days / DAYS_PER_MONTH).clip(lower=1)
+    out["reviews_per_month_est"] = (acc["num_reviews"] / months).round(2)
+    if "sentiment_sum" in acc.columns:
+        out["avg_review_sentiment"] = acc["sentiment_sum"] / acc["num_reviews"]
+    return out
 
 def load_data(
     listings_p: str,
     reviews_p: str | None = None,
-    neighborhoods_p: str | None = None
+    neighborhoods_p: str | None = None,
+    reviews_chunksize: int = REVIEWS_CHUNK_ROWS,
+    review_comments: bool = False
 ) -> pd.DataFrame:
     """
     Loads and merges listings CSV (required), plus reviews and neighborhood CSVs (optional).
+    Reviews are streamed in chunks of `reviews_chunksize` rows and merged as per-listing aggregates.
     Returns a DataFrame with merged columns if possible.
     """
     try:
@@ -21,11 +69,10 @@ def load_data(
     # Merge reviews if provided
     if reviews_p:
         try:
-            reviews_df = pd.read_csv(reviews_p)
-            # If reviews have 'listing_id', merge number of reviews to listings
-            if "id" in listings_df.columns and "listing_id" in reviews_df.columns:
-                count_series = reviews_df.groupby("listing_id").size().rename("num_reviews")
-                listings_df = listings_df.merge(count_series, left_on="id", right_index=True, how="left")
+            # If reviews have 'listing_id', merge review aggregates to listings
+            if "id" in listings_df.columns:
+                review_stats = aggregate_reviews(reviews_p, reviews_chunksize, review_comments)
+                listings_df = listings_df.merge(review_stats, left_on="id", right_index=True, how="left")
         except Exception:
             pass  # Reviews are optional
 
@@ -37,15 +84,18 @@ def load_data(
 def clean_data(df: pd.DataFrame, save_path: str | None = None) -> pd.DataFrame:
     """
     Cleans up columns and types in the given DataFrame.
-    - Converts price, latitude, longitude to numeric.
+    - Converts price ("$1,234.00" strings included), latitude, longitude to numeric.
+    - Derives amenities_count from the amenities column.
     - Saves to CSV if save_path is provided.
     """
     if "price" in df.columns:
-        df["price"] = pd.to_numeric(df["price"], errors="coerce")
+        df["price"] = parse_currency(df["price"])
     if "latitude" in df.columns:
         df["latitude"] = pd.to_numeric(df["latitude"], errors="coerce")
     if "longitude" in df.columns:
         df["longitude"] = pd.to_numeric(df["longitude"], errors="coerce")
+    if "amenities" in df.columns and "amenities_count" not in df.columns:
+        df["amenities_count"] = parse_amenities(df["amenities"]).counts
     # Add more cleaning steps as needed
 
     if save_path is not None:
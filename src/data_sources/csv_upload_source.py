@@ -1,5 +1,5 @@
 from .base import DataSource, SourceResult, register_source
-from src.data_preprocessing import clean_data
+from src.data_preprocessing import clean_data, aggregate_reviews
 import pandas as pd
 
 @register_source
@@ -10,9 +10,11 @@ class CSVUploadSource(DataSource):
         reviews_file = self.params.get("reviews_file")
         df = pd.read_csv(listings_file)
         if reviews_file:
-            rev_df = pd.read_csv(reviews_file)
-            if "id" in df.columns and "listing_id" in rev_df.columns:
-                counts = rev_df.groupby("listing_id").size().rename("num_reviews")
-                df = df.merge(counts, left_on="id", right_index=True, how="left")
+            if "id" in df.columns:
+                try:
+                    counts = aggregate_reviews(reviews_file)
+                    df = df.merge(counts, left_on="id", right_index=True, how="left")
+                except ValueError:
+                    pass  # Reviews are optional (e.g. a file without listing_id)
         df = clean_data(df, save_path="data/processed/manual_clean.csv")
         return SourceResult(df=df, metadata={"source_label": "Manual Upload"})
\ No newline at end of file
@@ -1,5 +1,6 @@
 from .base import DataSource, SourceResult, register_source
 from src.data_preprocessing import clean_data
+from src.amenities import parse_amenities
 import pandas as pd
 import requests
 from bs4 import BeautifulSoup
@@ -44,12 +45,9 @@ class ExternalSiteSource(DataSource):
         if "lon_raw" in df.columns:
             df["longitude"] = pd.to_numeric(df["lon_raw"], errors="coerce")
         if "amenities_raw" in df.columns:
-            df["amenities_list"] = (
-                df["amenities_raw"].astype(str)
-                .str.split("[,|]", regex=True)
-                .apply(lambda x: [a.strip().lower() for a in x if a.strip()] if isinstance(x, list) else [])
-            )
-            df["amenities_count"] = df["amenities_list"].apply(len)
+            parsed = parse_amenities(df["amenities_raw"], plain_sep="[,|]")
+            df["amenities_list"] = parsed.lists()
+            df["amenities_count"] = parsed.counts
         if "id" not in df.columns:
             df["id"] = df.index.astype(str)
         df = clean_data(df, save_path="data/processed/external_clean.csv")
@@ -2,6 +2,7 @@ from .base import DataSource, SourceResult, register_source
 from src.downloader import download_dataset
 from src.data_preprocessing import load_data, clean_data
 from src.scraper import DatasetVersion
+from src.snapshot_store import load_or_build
 
 @register_source
 class InsideAirbnbSource(DataSource):
@@ -21,8 +22,12 @@ class InsideAirbnbSource(DataSource):
             override_listings_url=override_url,
             allow_cached_if_blocked=allow_cached
         )
-        df = load_data(files["listings"], files["reviews"], files["neighbourhoods"])
-        df = clean_data(df, save_path=f"data/processed/{city}_{date}_clean.csv")
+        df = load_or_build(
+            city,
+            date,
+            [files["listings"], files["reviews"]],
+            lambda: clean_data(load_data(files["listings"], files["reviews"], files["neighbourhoods"]))
+        )
         meta = {
             "source_label": f"{city} {date}",
             "files": files,
@@ -0,0 +1,188 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from src.amenities import parse_amenities
+from src.quantile_sketch import QuantileSketch
+
+# Candidate names per column role, in priority order (exact match first, then substring).
+ROLE_CANDIDATES: Dict[str, List[str]] = {
+    "price": ["price", "nightly_price", "total_price", "cost"],
+    "amenities": ["amenities_count", "amenities"],
+    "reviews": ["number_of_reviews", "num_reviews", "reviews_count"],
+    "rating": ["review_scores_rating", "rating"],
+    "availability": ["availability_365", "availability"],
+}
+PROFILE_QUANTILES = (0.05, 0.25, 0.33, 0.5, 0.67, 0.75, 0.95)
+# Price band presets as price quantile ranges.
+PRICE_BANDS: Dict[str, Tuple[Optional[float], Optional[float]]] = {
+    "Budget": (None, 0.33),
+    "Comfort": (0.33, 0.67),
+    "Premium": (0.67, None),
+}
+
+@dataclass
+class ColumnStats:
+    name: str
+    dtype: str
+    numeric: bool
+    nulls: int
+    distinct: Optional[int] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    mean: Optional[float] = None
+    quantiles: Dict[float, float] = field(default_factory=dict)
+    sketch: Optional[QuantileSketch] = None  # any other quantile, and merging across frames
+
+    def quantile(self, q: float) -> Optional[float]:
+        if q in self.quantiles or self.sketch is None or not self.sketch.count:
+            return self.quantiles.get(q)
+        return self.sketch.quantile(q)
+
+def resolve_column(columns: Iterable[str], names: List[str]) -> Optional[str]:
+    """Same matching as metrics.get_column: an exact name, else the first column containing one."""
+    columns = list(columns)
+    for name in names:
+        if name in columns:
+            return name
+    for col in columns:
+        for name in names:
+            if name.lower() in col.lower():
+                return col
+    return None
+
+def _numeric_stats(name: str, dtype: str, values: np.ndarray, numeric: bool = True) -> ColumnStats:
+    # one sort gives min/max, distinct count and every quantile
+    s = np.sort(values[~np.isnan(values)])
+    stats = ColumnStats(name, dtype, numeric, nulls=int(len(values) - len(s)), distinct=0)
+    if len(s):
+        stats.distinct = int(1 + np.count_nonzero(s[1:] != s[:-1]))
+        stats.min, stats.max, stats.mean = float(s[0]), float(s[-1]), float(s.mean())
+        qs = np.asarray(PROFILE_QUANTILES)
+        vals = np.interp(qs * (len(s) - 1), np.arange(len(s)), s)
+        stats.quantiles = {float(q): float(v) for q, v in zip(qs, vals)}
+    stats.sketch = QuantileSketch().update(s)
+    return stats
+
+def merge_column_stats(a: ColumnStats, b: ColumnStats) -> ColumnStats:
+    """
+    Stats of two frames' same column (chunks, snapshots, cities) without their rows:
+    counts add, min/max/mean combine exactly, quantiles come from the merged sketch.
+    Distinct counts do not merge and become None.
+    """
+    out = ColumnStats(a.name, a.dtype, a.numeric and b.numeric, nulls=a.nulls + b.nulls)
+    if a.sketch is None or b.sketch is None:
+        return out
+    out.sketch = QuantileSketch.merged([a.sketch, b.sketch])
+    if out.sketch.count:
+        na, nb = a.sketch.count, b.sketch.count
+        out.min, out.max = out.sketch.min, out.sketch.max
+        out.mean = float(sum(s.mean * s.sketch.count for s in (a, b) if s.sketch.count) / (na + nb))
+        qs = list(PROFILE_QUANTILES)
+        out.quantiles = {float(q): float(v) for q, v in zip(qs, out.sketch.quantiles(qs))}
+    return out
+
+def _column_stats(series: pd.Series) -> ColumnStats:
+    dtype = str(series.dtype)
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return _numeric_stats(series.name, dtype, series.to_numpy(dtype=float, na_value=np.nan))
+    stats = ColumnStats(series.name, dtype, False, nulls=int(series.isna().sum()))
+    try:
+        stats.distinct = int(series.nunique())
+    except TypeError:
+        pass  # unhashable cells (lists)
+    return stats
+
+@dataclass
+class DatasetProfile:
+    """
+    Column statistics of a frame gathered in one pass per column: dtype, null count,
+    distinct count, min/max/mean and quantiles, plus the resolved column for each
+    role in ROLE_CANDIDATES. Role stats are numeric (text coerced like safe_mean;
+    an amenities text column is profiled as per-row amenity counts).
+    """
+    n_rows: int
+    columns: Dict[str, ColumnStats]
+    roles: Dict[str, Optional[str]]
+    role_stats: Dict[str, ColumnStats]
+
+    def column(self, role: str) -> Optional[str]:
+        return self.roles.get(role)
+
+    def mean(self, role: str) -> Optional[float]:
+        stats = self.role_stats.get(role)
+        return stats.mean if stats is not None else None
+
+    def value(self, listing, role: str) -> Optional[float]:
+        """One listing's (row / dict) value for a role, on the scale of role_stats."""
+        col = self.roles.get(role)
+        if col is None:
+            return None
+        raw = listing.get(col)
+        if role == "amenities" and not self.columns[col].numeric:
+            return float(parse_amenities(pd.Series([raw], dtype=object)).counts[0])
+        val = pd.to_numeric(pd.Series([raw], dtype=object), errors="coerce").iloc[0]
+        return float(val) if pd.notnull(val) else None
+
+    def numeric_columns(self, min_distinct: int = 2) -> List[str]:
+        return [c for c, s in self.columns.items() if s.numeric and (s.distinct or 0) >= min_distinct]
+
+    def categorical_columns(self, max_distinct: int = 50) -> List[str]:
+        return [
+            c for c, s in self.columns.items()
+            if not s.numeric and not s.dtype.startswith("datetime")
+            and s.distinct is not None and s.distinct < max_distinct
+        ]
+
+    def price_bands(self) -> Dict[str, Tuple[float, float]]:
+        """PRICE_BANDS resolved to price ranges; empty when there is no usable price column."""
+        stats = self.role_stats.get("price")
+        if stats is None or stats.min is None:
+            return {}
+        return {
+            band: (
+                stats.min if lo is None else stats.quantile(lo),
+                stats.max if hi is None else stats.quantile(hi),
+            )
+            for band, (lo, hi) in PRICE_BANDS.items()
+        }
+
+def build_profile(df: pd.DataFrame, columns: Optional[List[str]] = None) -> DatasetProfile:
+    """Profiles `columns` (default: all) and every role column of df."""
+    roles = {role: resolve_column(df.columns, names) for role, names in ROLE_CANDIDATES.items()}
+    wanted = list(df.columns) if columns is None else [c for c in columns if c in df.columns]
+    wanted += [c for c in roles.values() if c is not None and c not in wanted]
+    stats = {c: _column_stats(df[c]) for c in wanted}
+
+    role_stats: Dict[str, ColumnStats] = {}
+    for role, col in roles.items():
+        if col is None:
+            continue
+        if stats[col].numeric:
+            role_stats[role] = stats[col]
+        elif role == "amenities":
+            counts = parse_amenities(df[col]).counts.astype(float)
+            role_stats[role] = _numeric_stats(col, "int64", counts)
+        else:
+            values = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+            role_stats[role] = _numeric_stats(col, "float64", values, numeric=False)
+    return DatasetProfile(n_rows=len(df), columns=stats, roles=roles, role_stats=role_stats)
+
+def merge_profiles(profiles: List[DatasetProfile]) -> DatasetProfile:
+    """
+    One profile over several frames (e.g. every city of a batch run) from their column
+    sketches; columns and roles are those of the first profile present in all of them.
+    """
+    first = profiles[0]
+    columns = {c: s for c, s in first.columns.items()}
+    roles = dict(first.roles)
+    role_stats = dict(first.role_stats)
+    for other in profiles[1:]:
+        columns = {c: merge_column_stats(s, other.columns[c]) for c, s in columns.items() if c in other.columns}
+        role_stats = {
+            r: merge_column_stats(s, other.role_stats[r]) for r, s in role_stats.items()
+            if r in other.role_stats and other.roles.get(r) == roles.get(r)
+        }
+    roles = {r: (c if r in role_stats else None) for r, c in roles.items()}
+    return DatasetProfile(n_rows=sum(p.n_rows for p in profiles), columns=columns, roles=roles, role_stats=role_stats)
@@ -0,0 +1,134 @@
+from __future__ import annotations
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, List, Optional
+import pandas as pd
+from src.listing_schema import frame_bytes
+
+# Default memory ceiling for datasets nobody is looking at; in-use entries are never evicted.
+DATASET_STORE_MAX_BYTES = 2 * 1024 ** 3
+
+def enable_copy_on_write() -> None:
+    # Views handed to sessions share column data with the stored frame; under
+    # copy-on-write a session's writes copy the touched columns instead of leaking
+    # into other sessions. Always on (and the option deprecated) from pandas 3.
+    # This is a process-wide pandas option: call it once from the entry point that
+    # owns the process (the app), not from library code.
+    if int(pd.__version__.split(".")[0]) < 3:
+        pd.set_option("mode.copy_on_write", True)
+
+def _nbytes(value: Any) -> int:
+    if isinstance(value, pd.DataFrame):
+        return frame_bytes(value)
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(v) for v in value)
+    return 0
+
+def _view(value: Any) -> Any:
+    if isinstance(value, pd.DataFrame):
+        return value.copy(deep=False)
+    if isinstance(value, dict):
+        return dict(value)
+    if isinstance(value, tuple):
+        return tuple(_view(v) for v in value)
+    if isinstance(value, list):
+        return [_view(v) for v in value]
+    return value
+
+def _frames(value: Any) -> List[pd.DataFrame]:
+    if isinstance(value, pd.DataFrame):
+        return [value]
+    if isinstance(value, (tuple, list)):
+        return [f for v in value for f in _frames(v)]
+    return []
+
+@dataclass
+class _Entry:
+    value: Any
+    nbytes: int
+    refs: int = 0
+    loaded_at: float = field(default_factory=time.time)
+
+class DatasetStore:
+    """
+    Process-wide store of loaded datasets keyed by snapshot identity (any hashable,
+    e.g. the app's source key). The first session to ask for a key runs the loader;
+    concurrent requests for the same key wait for that load instead of repeating it.
+    Sessions get shallow copy-on-write views; an entry's reference count drops when
+    the last view handed out for it is garbage-collected (session closed or moved on).
+    Unreferenced entries are evicted least recently used first once the store holds
+    more than `max_bytes`. Views are only isolated with copy-on-write enabled (see
+    enable_copy_on_write).
+    """
+
+    def __init__(self, max_bytes: int = DATASET_STORE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._loading: Dict[Hashable, threading.Lock] = {}
+
+    @property
+    def nbytes(self) -> int:
+        with self._lock:
+            return sum(e.nbytes for e in self._entries.values())
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def acquire(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Returns a view of the dataset for `key`, running `loader` only if it is not stored."""
+        with self._lock:
+            load_lock = self._loading.setdefault(key, threading.Lock())
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is None:
+                value = loader()
+                entry = _Entry(value, _nbytes(value))
+                with self._lock:
+                    self._entries[key] = entry
+            with self._lock:
+                self._loading.pop(key, None)
+                self._entries.move_to_end(key)
+                view = _view(entry.value)
+                frames = _frames(view)
+                if frames:
+                    entry.refs += 1
+                    weakref.finalize(frames[0], self._release, key, entry)
+                self._evict()
+        return view
+
+    def _release(self, key: Hashable, entry: _Entry) -> None:
+        with self._lock:
+            entry.refs = max(entry.refs - 1, 0)
+            if self._entries.get(key) is entry:
+                self._evict()
+
+    def _evict(self) -> None:
+        total = sum(e.nbytes for e in self._entries.values())
+        for key in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            entry = self._entries[key]
+            if entry.refs == 0:
+                total -= entry.nbytes
+                del self._entries[key]
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drops one entry (or all); sessions holding views keep their data."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {"key": k, "bytes": e.nbytes, "refs": e.refs, "loaded_at": e.loaded_at}
+                for k, e in self._entries.items()
+            ]
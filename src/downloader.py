@@ -1,9 +1,16 @@
 from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Dict, Tuple, List
+from typing import Any, Optional, Dict, Mapping, Tuple, List
+import hashlib
+import json
+import os
+import re
 import time
 import random
+import zlib
 import requests
+import urllib3
 from src.scraper import DatasetVersion, HEADERS  # existing scraper module
 
 RAW_DIR = Path("data/raw")
@@ -26,45 +33,216 @@ BASE_HEADERS = {
     "DNT": "1",
 }
 
+CHUNK_BYTES = 1 << 20
+DOWNLOAD_WORKERS = 3
+_ETAG_MD5_RE = re.compile(r'^(?:W/)?"?([0-9a-f]{32})"?$')
+_CONTENT_RANGE_RE = re.compile(r"bytes \d+-\d+/(\d+)")
+
 session = requests.Session()
 session.headers.update(HEADERS)
 
 def _is_gzip(b: bytes) -> bool:
     return len(b) >= 2 and b[0] == 0x1F and b[1] == 0x8B
 
-def _save_file(city: str, date: str, base: str, suffix: str, data: bytes) -> Path:
-    p = RAW_DIR / f"{city}_{date}_{base}{suffix}"
-    p.write_bytes(data)
-    return p
+def _request_headers() -> Dict[str, str]:
+    # per-request headers; the shared session is used from several threads.
+    # identity: the body is written raw, so it must not carry a Content-Encoding
+    # (a gzip-encoded .csv would be saved compressed, and Range offsets would not line up)
+    return {**BASE_HEADERS, "User-Agent": random.choice(USER_AGENTS), "Accept-Encoding": "identity"}
+
+def _part_path(city: str, date: str, base: str) -> Path:
+    return RAW_DIR / f"{city}_{date}_{base}.part"
 
-def _fetch(url: str, timeout: int = 90):
+def _state_path(part: Path) -> Path:
+    return part.with_name(part.name + ".json")
+
+def _read_state(p: Path) -> Dict[str, Any]:
     try:
-        r = session.get(url, timeout=timeout, allow_redirects=True)
-        return r.status_code, r.content, dict(r.headers)
-    except requests.RequestException:
-        return 0, b"", {}
-
-def _try_download(url: str, expect_gzip: bool, city: str, date: str, base_name: str):
-    status, data, _ = _fetch(url)
-    note = f"http {status}, {len(data)} bytes"
-    if status != 200 or len(data) < MIN_VALID_SIZE_BYTES:
-        return None, note
-    if expect_gzip and _is_gzip(data):
-        return _save_file(city, date, base_name, ".csv.gz", data), f"{note} (gz)"
+        return json.loads(p.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+def _expected_total(status: int, headers: Mapping[str, str]) -> Optional[int]:
+    if status == 206:
+        m = _CONTENT_RANGE_RE.match(headers.get("Content-Range", ""))
+        return int(m.group(1)) if m else None
+    length = headers.get("Content-Length")
+    return int(length) if length and length.isdigit() else None
+
+def _stream_download(
+    url: str,
+    part: Path,
+    timeout: int = 90,
+    validators: Optional[Mapping[str, Any]] = None
+) -> Tuple[int, Dict[str, Any]]:
+    """
+    Streams `url` into `part` in CHUNK_BYTES pieces. A leftover part from an earlier
+    attempt on the same URL is resumed with a Range request (guarded by If-Range so a
+    changed file restarts from zero). Otherwise `validators` (sidecar metadata of the
+    cached copy) turn the request into a conditional GET that may answer 304.
+    Returns (http status, state) where state holds url, etag, last_modified and the
+    expected total size; status 0 means a network error.
+    """
+    state_p = _state_path(part)
+    state = _read_state(state_p)
+    offset = part.stat().st_size if part.exists() else 0
+    headers = _request_headers()
+    if offset and state.get("url") == url:
+        headers["Range"] = f"bytes={offset}-"
+        validator = state.get("etag") or state.get("last_modified")
+        if validator:
+            headers["If-Range"] = validator
+    else:
+        offset = 0
+        if validators and validators.get("url") == url:
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+    try:
+        with session.get(url, headers=headers, timeout=timeout, stream=True, allow_redirects=True) as r:
+            if r.status_code == 416 and offset and state.get("total") == offset:
+                return 206, state  # part already holds the whole file
+            if r.status_code == 304:
+                return 304, state
+            if r.status_code not in (200, 206):
+                return r.status_code, state
+            state = {
+                "url": url,
+                "etag": r.headers.get("ETag"),
+                "last_modified": r.headers.get("Last-Modified"),
+                "total": _expected_total(r.status_code, r.headers),
+            }
+            state_p.write_text(json.dumps(state), encoding="utf-8")
+            with part.open("ab" if r.status_code == 206 else "wb") as f:
+                # raw bytes, so the file matches Content-Length / ETag even with transfer encodings
+                for chunk in r.raw.stream(CHUNK_BYTES, decode_content=False):
+                    f.write(chunk)
+            return r.status_code, state
+    except (requests.RequestException, urllib3.exceptions.HTTPError, OSError):
+        return 0, state
+
+def _gzip_intact(p: Path) -> bool:
+    # decompressing to the end validates the gzip trailer (CRC32 + size)
+    d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    with p.open("rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_BYTES), b""):
+            try:
+                d.decompress(chunk)
+            except zlib.error:
+                return False
+            while d.eof and d.unused_data:
+                # concatenated gzip members
+                rest = d.unused_data
+                d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                try:
+                    d.decompress(rest)
+                except zlib.error:
+                    return False
+    return d.eof
+
+def _hash_file(p: Path, algo: str) -> str:
+    h = hashlib.new(algo)
+    with p.open("rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_BYTES), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _meta_path(p: Path) -> Path:
+    return p.with_name(p.name + ".meta.json")
+
+def read_cache_meta(p: Path) -> Dict[str, Any]:
+    """Sidecar metadata of a cached raw file: url, etag, last_modified, content_length, sha256."""
+    return _read_state(_meta_path(p))
+
+def _write_cache_meta(p: Path, state: Mapping[str, Any]) -> None:
+    meta = {
+        "url": state.get("url"),
+        "etag": state.get("etag"),
+        "last_modified": state.get("last_modified"),
+        "content_length": p.stat().st_size,
+        "sha256": _hash_file(p, "sha256"),
+    }
+    _meta_path(p).write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+def _verify_part(part: Path, state: Mapping[str, Any]) -> Optional[str]:
+    """
+    Returns None when the finished part is acceptable, "incomplete" when it can be
+    resumed, or a reason string when it is corrupt and must be discarded.
+    """
+    size = part.stat().st_size
+    total = state.get("total")
+    if total is not None and size < total:
+        return "incomplete"
+    if total is not None and size > total:
+        return f"size {size} != expected {total}"
+    if size < MIN_VALID_SIZE_BYTES:
+        return "too small"
+    m = _ETAG_MD5_RE.match(state.get("etag") or "")
+    if m and not (state.get("etag") or "").startswith("W/") and _hash_file(part, "md5") != m.group(1):
+        return "etag mismatch"
+    with part.open("rb") as f:
+        head = f.read(2)
+    if _is_gzip(head) and not _gzip_intact(part):
+        return "bad gzip trailer"
+    return None
+
+def _final_suffix(url: str, expect_gzip: bool, head: bytes) -> Tuple[str, str]:
+    if expect_gzip and _is_gzip(head):
+        return ".csv.gz", " (gz)"
     if url.endswith(".csv"):
-        return _save_file(city, date, base_name, ".csv", data), note
-    if expect_gzip and not _is_gzip(data):
+        return ".csv", ""
+    if expect_gzip and not _is_gzip(head):
         # fallback treat as plain
-        return _save_file(city, date, base_name, ".csv", data), f"{note} (plain)"
+        return ".csv", " (plain)"
     if url.endswith(".geojson"):
-        return _save_file(city, date, base_name, ".geojson", data), note
-    return _save_file(city, date, base_name, ".dat", data), note
+        return ".geojson", ""
+    return ".dat", ""
+
+def _try_download(
+    url: str,
+    expect_gzip: bool,
+    city: str,
+    date: str,
+    base_name: str,
+    cached: Optional[Path] = None
+):
+    part = _part_path(city, date, base_name)
+    validators = read_cache_meta(cached) if cached else None
+    status, state = _stream_download(url, part, validators=validators)
+    if status == 304 and cached:
+        return cached, "http 304, not modified"
+    size = part.stat().st_size if part.exists() else 0
+    note = f"http {status}, {size} bytes"
+    if status == 0 and size:
+        return None, f"{note} (partial, will resume)"
+    if status not in (200, 206) or not part.exists():
+        return None, note
+    problem = _verify_part(part, state)
+    if problem == "incomplete":
+        return None, f"{note} of {state.get('total')} (partial, will resume)"
+    if problem:
+        part.unlink(missing_ok=True)
+        _state_path(part).unlink(missing_ok=True)
+        return None, f"{note} ({problem})"
+    with part.open("rb") as f:
+        head = f.read(2)
+    suffix, tag = _final_suffix(url, expect_gzip, head)
+    final = RAW_DIR / f"{city}_{date}_{base_name}{suffix}"
+    os.replace(part, final)
+    _state_path(part).unlink(missing_ok=True)
+    _write_cache_meta(final, state)
+    return final, f"{note}{tag}"
 
 def _cached_file(city: str, date: str, base: str) -> Optional[Path]:
-    for suf in (".csv.gz", ".csv"):
+    for suf in (".csv.gz", ".csv", ".geojson"):
         p = RAW_DIR / f"{city}_{date}_{base}{suf}"
-        if p.exists() and p.stat().st_size >= MIN_VALID_SIZE_BYTES:
-            return p
+        if not p.exists() or p.stat().st_size < MIN_VALID_SIZE_BYTES:
+            continue
+        expected = read_cache_meta(p).get("content_length")
+        if expected is not None and p.stat().st_size != expected:
+            continue  # truncated or replaced behind the cache's back
+        return p
     return None
 
 def download_dataset(
@@ -75,10 +253,18 @@ def download_dataset(
     override_listings_url: Optional[str] = None,
     allow_cached_if_blocked: bool = True,
     max_retries: int = 4,
-    backoff_base: float = 1.2
+    backoff_base: float = 1.2,
+    max_workers: int = DOWNLOAD_WORKERS,
+    revalidate: bool = True
 ) -> Dict[str, Optional[Path]]:
     """
     Enhanced dataset downloader with:
+      - Listings, reviews and neighbourhoods fetched concurrently (max_workers threads)
+      - Chunked streaming to disk, resumed with Range requests after a partial failure
+      - Size / ETag / gzip trailer checks before a file enters the cache
+      - Cached files are reused as-is unless force=True; a forced refresh sends
+        If-None-Match / If-Modified-Since from the sidecar metadata (revalidate=True)
+        so an unchanged snapshot costs one 304 round-trip
       - Rotating User-Agent & retry
       - Override URL support
       - Fallback to cached even when force=True (if allow_cached_if_blocked)
@@ -97,20 +283,22 @@ def download_dataset(
     def record(label: str, msg: str):
         attempts.append((label, msg))
 
-    def rotate_headers():
-        session.headers.update({**BASE_HEADERS, "User-Agent": random.choice(USER_AGENTS)})
-
     def try_retries(label: str, url: str, expect_gzip: bool, base_name: str):
         nonlocal blocked
+        cached = _cached_file(city, date, base_name)
+        if cached and not force:
+            record(f"{label}-cache", f"used {cached.name}")
+            return cached
+        validated = cached if revalidate else None
         for attempt in range(1, max_retries + 1):
-            rotate_headers()
-            f, note = _try_download(url, expect_gzip, city, date, base_name)
+            f, note = _try_download(url, expect_gzip, city, date, base_name, validated)
             record(f"{label}-try{attempt}", note)
             if f:
                 return f
             if "http 403" in note:
                 blocked = True
-            time.sleep((backoff_base ** (attempt - 1)) + random.uniform(0, 0.4))
+            if attempt < max_retries:
+                time.sleep((backoff_base ** (attempt - 1)) + random.uniform(0, 0.4))
         return None
 
     # Build listing url candidates
@@ -123,13 +311,28 @@ def download_dataset(
             if version.listings_url.endswith(".csv.gz"):
                 listings_urls.append(("alt", version.listings_url.replace(".csv.gz", ".csv"), False))
 
-    cached_before = None if force else _cached_file(city, date, "listings")
+    def fetch_listings():
+        for lbl, url, gz in listings_urls:
+            f = try_retries(f"listings-{lbl}", url, gz, "listings")
+            if f:
+                return f
+        return None
 
-    # Attempt
-    for lbl, url, gz in listings_urls:
-        out["listings"] = try_retries(f"listings-{lbl}", url, gz, "listings")
-        if out["listings"]:
-            break
+    # Attempt all files at once; reviews & neighbourhoods are best-effort
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        jobs = {"listings": pool.submit(fetch_listings)}
+        if version.reviews_url:
+            jobs["reviews"] = pool.submit(try_retries, "reviews", version.reviews_url, True, "reviews")
+        if version.neighbourhoods_url:
+            jobs["neighbourhoods"] = pool.submit(
+                try_retries, "neighbourhoods", version.neighbourhoods_url, False, "neighbourhoods"
+            )
+        elif version.neighbourhoods_geojson_url:
+            jobs["neighbourhoods"] = pool.submit(
+                try_retries, "neigh-geojson", version.neighbourhoods_geojson_url, False, "neighbourhoods"
+            )
+        for key, job in jobs.items():
+            out[key] = job.result()
 
     # Fallback to cache
     if not out["listings"]:
@@ -138,14 +341,6 @@ def download_dataset(
             out["listings"] = cached_anyway
             record("listings-cache-fallback", f"used {cached_anyway.name}")
 
-    # Reviews & neighbourhoods best-effort
-    if version.reviews_url:
-        out["reviews"] = try_retries("reviews", version.reviews_url, True, "reviews")
-    if version.neighbourhoods_url:
-        out["neighbourhoods"] = try_retries("neighbourhoods", version.neighbourhoods_url, False, "neighbourhoods")
-    elif version.neighbourhoods_geojson_url:
-        out["neighbourhoods"] = try_retries("neigh-geojson", version.neighbourhoods_geojson_url, False, "neighbourhoods")
-
     out["status_info"] = attempts
     out["blocked"] = blocked
 
@@ -0,0 +1,124 @@
+from __future__ import annotations
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from src.amenity_index import AmenityIndex
+
+REVIEW_COLUMNS = ["number_of_reviews", "num_reviews", "reviews_count"]
+
+class _SortedColumn:
+    """Column values plus the row positions that sort them; NaN rows never match a range."""
+
+    def __init__(self, values: np.ndarray):
+        self.values = values
+        valid = np.flatnonzero(~np.isnan(values))
+        self.order = valid[np.argsort(values[valid], kind="stable")]
+        self.sorted = values[self.order]
+
+    def span(self, lo: float, hi: float) -> Tuple[int, int]:
+        return (
+            int(np.searchsorted(self.sorted, lo, side="left")),
+            int(np.searchsorted(self.sorted, hi, side="right")),
+        )
+
+def _column(df: pd.DataFrame, col: Optional[str], fill: Optional[float] = None) -> Optional[_SortedColumn]:
+    if not col or col not in df.columns:
+        return None
+    values = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+    if fill is not None:
+        values = np.where(np.isnan(values), fill, values)
+    return _SortedColumn(values)
+
+def _bounds(rng) -> Tuple[float, float]:
+    lo, hi = rng
+    return (-np.inf if lo is None else lo), (np.inf if hi is None else hi)
+
+class ListingFilterIndex:
+    """
+    Per-dataset filter structures, built once after scoring: sorted value arrays for
+    price, reviews, rating, availability, accommodates, amenities count, value score and
+    price per person, room_type category codes and an AmenityIndex. query() answers the same
+    predicates as filter_by_preferences with a few searchsorted calls and array
+    gathers and returns sorted row positions (for .iloc) without copying the frame.
+    Missing-value handling matches filter_by_preferences (counts/ratings as 0, NaN
+    price excluded).
+    """
+
+    def __init__(self, df: pd.DataFrame, build_amenities: bool = True):
+        self.n_rows = len(df)
+        self.reviews_col = next((c for c in REVIEW_COLUMNS if c in df.columns), None)
+        self.columns: Dict[str, Optional[_SortedColumn]] = {
+            "price": _column(df, "price"),
+            "reviews": _column(df, self.reviews_col, fill=0),
+            "rating": _column(df, "review_scores_rating", fill=0),
+            "availability": _column(df, "availability_365", fill=0),
+            "accommodates": _column(df, "accommodates", fill=0),
+            "amenities_count": _column(df, "amenities_count", fill=0),
+            "value_score": _column(df, "score_price_value"),
+            "price_per_person": None,
+        }
+        if "price" in df.columns and "accommodates" in df.columns:
+            price = pd.to_numeric(df["price"], errors="coerce").to_numpy(dtype=float)
+            acc = pd.to_numeric(df["accommodates"], errors="coerce").to_numpy(dtype=float)
+            self.columns["price_per_person"] = _SortedColumn(price / np.where(acc == 0, 1, acc))
+        self.room_categories: List[str] = []
+        self.room_codes: Optional[np.ndarray] = None
+        if "room_type" in df.columns:
+            cat = pd.Categorical(df["room_type"])
+            self.room_categories = list(cat.categories)
+            self.room_codes = np.asarray(cat.codes)
+        self.amenities: Optional[AmenityIndex] = AmenityIndex.from_frame(df) if build_amenities else None
+
+    def query(
+        self,
+        price_range: Optional[tuple[float,float]] = None,
+        reviews_range: Optional[tuple[int,int]] = None,
+        rating_range: Optional[tuple[float,float]] = None,
+        availability_range: Optional[tuple[int,int]] = None,
+        accommodates_range: Optional[tuple[int,int]] = None,
+        room_types: Optional[List[str]] = None,
+        required_amenities: Optional[List[str]] = None,
+        min_amenities_count: Optional[int] = None,
+        min_value_score: Optional[float] = None,
+        max_price_per_person: Optional[float] = None
+    ) -> np.ndarray:
+        ranges = []
+        for key, rng in [
+            ("price", price_range),
+            ("reviews", reviews_range),
+            ("rating", rating_range),
+            ("availability", availability_range),
+            ("accommodates", accommodates_range),
+            ("amenities_count", None if min_amenities_count is None else (min_amenities_count, None)),
+            ("value_score", None if min_value_score is None else (min_value_score, None)),
+            ("price_per_person", None if max_price_per_person is None else (None, max_price_per_person)),
+        ]:
+            col = self.columns[key]
+            if rng and col is not None:
+                lo, hi = _bounds(rng)
+                ranges.append((col, lo, hi, col.span(lo, hi)))
+
+        if ranges:
+            # drive from the most selective range, check the rest on the candidates only
+            ranges.sort(key=lambda r: r[3][1] - r[3][0])
+            col, _, _, (a, b) = ranges[0]
+            cand = col.order[a:b]
+            for col, lo, hi, _ in ranges[1:]:
+                v = col.values[cand]
+                cand = cand[(v >= lo) & (v <= hi)]
+        elif required_amenities and self.amenities is not None:
+            cand = self.amenities.rows_with_all(required_amenities)
+            required_amenities = None
+        else:
+            cand = np.arange(self.n_rows)
+
+        if room_types and self.room_codes is not None:
+            allowed = np.zeros(len(self.room_categories) + 1, dtype=bool)  # last slot: NaN (code -1)
+            wanted = set(room_types)
+            allowed[[i for i, c in enumerate(self.room_categories) if c in wanted]] = True
+            cand = cand[allowed[self.room_codes[cand]]]
+
+        if required_amenities and self.amenities is not None:
+            cand = self.amenities.filter(np.sort(cand), required_amenities)
+
+        return np.sort(cand)
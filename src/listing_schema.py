@@ -0,0 +1,115 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+# Storage type per known listings column. Integer kinds are range-checked and fall
+# back to float32 when the column has missing values; coordinates stay float64.
+# Narrow integers are for storage only: code doing arithmetic on them (squares,
+# products) must widen to float first, as every scorer and feature block does.
+COLUMN_TYPES: Dict[str, str] = {
+    "id": "int64",
+    "host_id": "int64",
+    "price": "currency",
+    "latitude": "float64",
+    "longitude": "float64",
+    "accommodates": "int16",
+    "bedrooms": "int16",
+    "beds": "int16",
+    "minimum_nights": "int32",
+    "number_of_reviews": "int32",
+    "num_reviews": "int32",
+    "reviews_count": "int32",
+    "availability_365": "int16",
+    "amenities_count": "int16",
+    "reviews_per_month": "float32",
+    "reviews_per_month_est": "float32",
+    "review_scores_rating": "float32",
+    "review_scores_value": "float32",
+    "review_scores_cleanliness": "float32",
+    "room_type": "category",
+    "property_type": "category",
+    "neighbourhood": "category",
+    "neighbourhood_cleansed": "category",
+    "last_review": "datetime",
+    "last_review_date": "datetime",
+}
+
+# Columns only present in InsideAirbnb exports; such frames can be cut down to ANALYSIS_COLUMNS.
+INSIDEAIRBNB_MARKERS = ("scrape_id", "listing_url")
+
+def is_insideairbnb_frame(df: pd.DataFrame) -> bool:
+    return all(c in df.columns for c in INSIDEAIRBNB_MARKERS)
+
+def parse_currency(values: pd.Series) -> pd.Series:
+    """'$1,234.00' / '€80' / 95 -> float; anything unparseable becomes NaN."""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float)
+    text = values.astype(str).str.replace(r"[^0-9.\-]", "", regex=True)
+    return pd.to_numeric(text, errors="coerce").astype(float)
+
+def _as_int(values: pd.Series, dtype: str) -> pd.Series:
+    nums = pd.to_numeric(values, errors="coerce")
+    if nums.isna().any():
+        return nums.astype(np.float32)
+    info = np.iinfo(dtype)
+    if len(nums) and (nums.min() < info.min or nums.max() > info.max or (nums % 1 != 0).any()):
+        return nums.astype(np.float64 if dtype == "int64" else np.float32)
+    return nums.astype(dtype)
+
+def _convert(values: pd.Series, kind: str) -> pd.Series:
+    if kind == "currency":
+        return parse_currency(values).astype(np.float32)
+    if kind == "category":
+        return values if isinstance(values.dtype, pd.CategoricalDtype) else values.astype("category")
+    if kind == "datetime":
+        return pd.to_datetime(values, errors="coerce")
+    if kind.startswith("int"):
+        return _as_int(values, kind)
+    return pd.to_numeric(values, errors="coerce").astype(kind)
+
+def frame_bytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+@dataclass
+class MemoryReport:
+    rows: int
+    columns_before: int
+    columns_after: int
+    bytes_before: int
+    bytes_after: int
+
+    @property
+    def ratio(self) -> float:
+        return self.bytes_before / self.bytes_after if self.bytes_after else float("inf")
+
+    def __str__(self) -> str:
+        mb = 1024 * 1024
+        return (
+            f"{self.rows} rows: {self.columns_before} -> {self.columns_after} columns, "
+            f"{self.bytes_before / mb:.1f} MB -> {self.bytes_after / mb:.1f} MB ({self.ratio:.1f}x smaller)"
+        )
+
+def compact_listings(
+    df: pd.DataFrame,
+    columns: Optional[Sequence[str]] = None,
+    types: Optional[Dict[str, str]] = None
+) -> Tuple[pd.DataFrame, MemoryReport]:
+    """
+    Returns a typed copy of a listings frame holding only `columns` (those present;
+    default: all) with COLUMN_TYPES applied, plus before/after memory usage.
+    Unknown columns are kept as they are. Columns that fail to convert are left unchanged.
+    """
+    types = COLUMN_TYPES if types is None else types
+    keep: List[str] = list(df.columns) if columns is None else [c for c in columns if c in df.columns]
+    before = frame_bytes(df)
+    out = {}
+    for col in keep:
+        kind = types.get(col)
+        try:
+            out[col] = _convert(df[col], kind) if kind else df[col]
+        except (TypeError, ValueError):
+            out[col] = df[col]
+    compact = pd.DataFrame(out, index=df.index)
+    return compact, MemoryReport(len(df), df.shape[1], compact.shape[1], before, frame_bytes(compact))
@@ -1,10 +1,64 @@
 from pathlib import Path
+from typing import Any, Dict, Optional, Sequence
+import hashlib
 import joblib
+import pandas as pd
 from datetime import datetime
 
+REGISTRY_DIR = Path("models/registry")
+
 def save_model(model, city: str, date: str, models_dir: Path = Path("models")) -> Path:
     models_dir.mkdir(parents=True, exist_ok=True)
     ts = datetime.utcnow().strftime("%Y%m%d%H%M%S")
     path = models_dir / f"{city}_{date}_{ts}_model.joblib"
     joblib.dump(model, path)
-    return path
\ No newline at end of file
+    return path
+
+def feature_set_hash(features: Sequence[str]) -> str:
+    return hashlib.sha256(",".join(features).encode("utf-8")).hexdigest()[:10]
+
+def frame_hash(df: pd.DataFrame) -> str:
+    """Content hash of a frame's values (row order included), used as the data part of a registry key."""
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return hashlib.sha256(row_hashes.tobytes()).hexdigest()[:16]
+
+def registry_path(city: str, date: str, features: Sequence[str], data_hash: str,
+                  registry_dir: Path = REGISTRY_DIR) -> Path:
+    return registry_dir / f"{city}_{date}_{feature_set_hash(features)}_{data_hash}.joblib"
+
+def register_model(entry: Dict[str, Any], city: str, date: str, features: Sequence[str], data_hash: str,
+                   registry_dir: Path = REGISTRY_DIR) -> Path:
+    """Persists a registry entry (the model plus whatever it needs for later incremental updates)."""
+    registry_dir.mkdir(parents=True, exist_ok=True)
+    path = registry_path(city, date, features, data_hash, registry_dir)
+    joblib.dump(entry, path)
+    return path
+
+def load_registered(city: str, date: str, features: Sequence[str], data_hash: str,
+                    registry_dir: Path = REGISTRY_DIR) -> Optional[Dict[str, Any]]:
+    path = registry_path(city, date, features, data_hash, registry_dir)
+    if not path.exists():
+        return None
+    try:
+        return joblib.load(path)
+    except Exception:
+        return None
+
+def latest_registered(city: str, features: Sequence[str], before: Optional[str] = None,
+                      registry_dir: Path = REGISTRY_DIR) -> Optional[Dict[str, Any]]:
+    """
+    Most recent entry for the same city and feature set, optionally restricted to
+    snapshot dates <= `before`; the starting point for an incremental update.
+    """
+    fhash = feature_set_hash(features)
+    candidates = []
+    for p in registry_dir.glob(f"{city}_*_{fhash}_*.joblib"):
+        p_city, p_date, _, _ = p.stem.rsplit("_", 3)
+        if p_city == city and (before is None or p_date <= before):
+            candidates.append((p_date, p.stat().st_mtime, p))
+    for _, _, p in sorted(candidates, reverse=True):
+        try:
+            return joblib.load(p)
+        except Exception:
+            continue
+    return None
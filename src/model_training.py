@@ -1,26 +1,184 @@
+from typing import Optional
+import time
+import numpy as np
+import pandas as pd
 from sklearn.linear_model import LinearRegression
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from sklearn.preprocessing import StandardScaler
+from src.model_persistence import frame_hash, load_registered, latest_registered, register_model
 
-def train_price_model(df):
-    features = [c for c in ["latitude","longitude","number_of_reviews","availability_365"] if c in df.columns]
+PRICE_FEATURES = ["latitude", "longitude", "number_of_reviews", "availability_365"]
+
+FULL_KMEANS_MAX_ROWS = 20_000
+CLUSTER_SAMPLE_ROWS = 50_000
+CLUSTER_BATCH_ROWS = 4096
+CLUSTER_MAX_EPOCHS = 20
+
+class IncrementalLinearRegression:
+    """
+    Ordinary least squares kept as sufficient statistics (X'X and X'y of the
+    shifted design with an intercept column), so rows can be added with
+    partial_fit and removed again with sign=-1 without refitting from scratch.
+    The shift is fixed by the first batch to keep X'X well conditioned.
+    """
+
+    def __init__(self):
+        self.shift_ = None
+        self.xtx_ = None
+        self.xty_ = None
+        self.n_samples_ = 0
+        self.coef_ = None
+        self.intercept_ = 0.0
+
+    def _design(self, X: np.ndarray) -> np.ndarray:
+        return np.column_stack([np.ones(len(X)), X - self.shift_])
+
+    def partial_fit(self, X, y, sign: float = 1.0) -> "IncrementalLinearRegression":
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+        if self.shift_ is None:
+            self.shift_ = X.mean(axis=0) if len(X) else np.zeros(X.shape[1])
+            self.xtx_ = np.zeros((X.shape[1] + 1, X.shape[1] + 1))
+            self.xty_ = np.zeros(X.shape[1] + 1)
+        if len(X):
+            A = self._design(X)
+            self.xtx_ += sign * (A.T @ A)
+            self.xty_ += sign * (A.T @ y)
+            self.n_samples_ += int(sign * len(X))
+        self._solve()
+        return self
+
+    def fit(self, X, y) -> "IncrementalLinearRegression":
+        self.shift_ = None
+        self.n_samples_ = 0
+        return self.partial_fit(X, y)
+
+    def _solve(self) -> None:
+        beta = np.linalg.lstsq(self.xtx_, self.xty_, rcond=None)[0]
+        self.coef_ = beta[1:]
+        self.intercept_ = float(beta[0] - beta[1:] @ self.shift_)
+
+    def predict(self, X) -> np.ndarray:
+        return np.asarray(X, dtype=float) @ self.coef_ + self.intercept_
+
+def _row_hashes(ids: pd.Series, X: np.ndarray, y: np.ndarray) -> np.ndarray:
+    frame = pd.DataFrame(X)
+    frame["_id"] = ids.to_numpy()
+    frame["_y"] = y
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+def train_price_model(df, city: Optional[str] = None, date: Optional[str] = None):
+    """
+    Fits price ~ location/reviews/availability. With city and date the model goes
+    through the registry: an unchanged (city, date, features, data) key loads the
+    stored model, and a new snapshot of a known city starts from the latest stored
+    model and only adds/removes the rows that changed.
+    """
+    features = [c for c in PRICE_FEATURES if c in df.columns]
     if not features:
         raise ValueError("No feature columns available for price model.")
     df = df.dropna(subset=features + ["price"])
-    X = df[features]
-    y = df["price"]
-    model = LinearRegression()
-    model.fit(X, y)
+    X = df[features].to_numpy(dtype=float)
+    y = df["price"].to_numpy(dtype=float)
+
+    if not (city and date):
+        model = LinearRegression()
+        model.fit(X, y)
+        df["predicted_price"] = model.predict(X)
+        return model, df
+
+    ids = df["id"] if "id" in df.columns else pd.Series(np.arange(len(df)))
+    data_hash = frame_hash(df[[c for c in ["id"] if c in df.columns] + features + ["price"]])
+    entry = load_registered(city, date, features, data_hash)
+    if entry is None:
+        hashes = _row_hashes(ids, X, y)
+        prev = latest_registered(city, features, before=date) if ids.is_unique else None
+        if prev is not None and pd.Index(prev["row_hashes"]).is_unique:
+            model = prev["model"]
+            gone = ~np.isin(prev["row_hashes"], hashes)
+            new = ~np.isin(hashes, prev["row_hashes"])
+            model.partial_fit(prev["X"][gone], prev["y"][gone], sign=-1.0)
+            model.partial_fit(X[new], y[new])
+        else:
+            model = IncrementalLinearRegression().fit(X, y)
+        entry = {"model": model, "features": features, "row_hashes": hashes, "X": X, "y": y}
+        register_model(entry, city, date, features, data_hash)
+    model = entry["model"]
     df["predicted_price"] = model.predict(X)
     return model, df
 
-def cluster_hosts(df, n_clusters=4):
+def _nearest_centroid(X: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    # squared euclidean distances via one matrix product, no per-row Python
+    d = (X * X).sum(axis=1)[:, None] - 2.0 * (X @ centers.T) + (centers * centers).sum(axis=1)[None, :]
+    return d.argmin(axis=1).astype(np.int32)
+
+def _minibatch_kmeans(X: np.ndarray, n_clusters: int, time_budget: Optional[float]) -> MiniBatchKMeans:
+    """
+    MiniBatchKMeans on a random sample of at most CLUSTER_SAMPLE_ROWS rows. With a
+    time budget (seconds) it runs partial_fit epochs until the centres settle or the
+    budget is spent; the first batch always runs so there is a model to return.
+    """
+    rng = np.random.default_rng(42)
+    if len(X) > CLUSTER_SAMPLE_ROWS:
+        X = X[rng.choice(len(X), CLUSTER_SAMPLE_ROWS, replace=False)]
+    km = MiniBatchKMeans(n_clusters=n_clusters, random_state=42, batch_size=CLUSTER_BATCH_ROWS, n_init=3)
+    if time_budget is None:
+        return km.fit(X)
+    deadline = time.monotonic() + time_budget
+    prev = None
+    for _ in range(CLUSTER_MAX_EPOCHS):
+        order = rng.permutation(len(X))
+        for start in range(0, len(X), CLUSTER_BATCH_ROWS):
+            batch = X[order[start:start + CLUSTER_BATCH_ROWS]]
+            if len(batch) >= n_clusters:
+                km.partial_fit(batch)
+            if time.monotonic() > deadline and hasattr(km, "cluster_centers_"):
+                return km
+        if prev is not None and np.abs(km.cluster_centers_ - prev).max() < 1e-4:
+            break
+        prev = km.cluster_centers_.copy()
+    return km
+
+def cluster_hosts(
+    df,
+    n_clusters=4,
+    mode: str = "auto",
+    time_budget: Optional[float] = None,
+    city: Optional[str] = None,
+    date: Optional[str] = None
+):
+    """
+    Segments listings on price / reviews / availability.
+    mode="full" runs KMeans(n_init=10) on every row; mode="minibatch" fits
+    MiniBatchKMeans on a sample (within `time_budget` seconds if given) and assigns
+    every row to its nearest centroid; "auto" picks minibatch above FULL_KMEANS_MAX_ROWS.
+    With city and date the scaler and centroids are cached per snapshot in the registry.
+    """
     features = [c for c in ["price","number_of_reviews","availability_365"] if c in df.columns]
     df = df.dropna(subset=features)
     if len(df) < n_clusters:
         n_clusters = max(2, len(df))
+    if mode == "auto":
+        mode = "full" if len(df) <= FULL_KMEANS_MAX_ROWS else "minibatch"
+
+    key = None
+    if city and date:
+        key = (city, date, ["cluster", mode, f"k={n_clusters}"] + features,
+               frame_hash(df[[c for c in ["id"] if c in df.columns] + features]))
+        entry = load_registered(*key)
+        if entry is not None:
+            X_scaled = entry["scaler"].transform(df[features])
+            df["cluster"] = _nearest_centroid(X_scaled, entry["model"].cluster_centers_)
+            return entry["model"], df
+
     scaler = StandardScaler()
     X_scaled = scaler.fit_transform(df[features])
-    kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-    df["cluster"] = kmeans.fit_predict(X_scaled)
-    return kmeans, df
\ No newline at end of file
+    if mode == "minibatch":
+        kmeans = _minibatch_kmeans(X_scaled, n_clusters, time_budget)
+        df["cluster"] = _nearest_centroid(X_scaled, kmeans.cluster_centers_)
+    else:
+        kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+        df["cluster"] = kmeans.fit_predict(X_scaled)
+    if key is not None:
+        register_model({"model": kmeans, "scaler": scaler}, *key)
+    return kmeans, df
@@ -0,0 +1,197 @@
+from __future__ import annotations
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+from src.quantile_sketch import QuantileSketch
+from src.scraper import CatalogType, DatasetVersion, scrape_catalog
+from src.utils.safe_io import atomic_path
+
+SCORED_DIR = Path("data/processed/scored")
+SCORED_DIR.mkdir(parents=True, exist_ok=True)
+
+BATCH_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+# Clustering time budget per city; batch runs are not interactive.
+BATCH_BUDGET_SECONDS = 60.0
+
+@dataclass
+class BatchJob:
+    country: str
+    region: str
+    city: str
+    date: str
+    version: DatasetVersion
+
+    @property
+    def name(self) -> str:
+        return f"{self.country}/{self.region}/{self.city}/{self.date}"
+
+def select_jobs(
+    catalog: CatalogType,
+    countries: Optional[Sequence[str]] = None,
+    cities: Optional[Sequence[str]] = None,
+    all_dates: bool = False
+) -> List[BatchJob]:
+    """(country, region, city, date) jobs from a scrape_catalog() result; latest snapshot per city by default."""
+    jobs = []
+    for country, regions in sorted(catalog.items()):
+        if countries and country not in countries:
+            continue
+        for region, entries in sorted(regions.items()):
+            for city, entry in sorted(entries.items()):
+                if cities and city not in cities:
+                    continue
+                dates = sorted(entry.versions) if all_dates else [entry.latest_date]
+                jobs.extend(BatchJob(country, region, city, d, entry.versions[d]) for d in dates)
+    return jobs
+
+def scored_output_path(job: BatchJob, out_dir: Path = SCORED_DIR) -> Path:
+    return out_dir / f"{job.country}_{job.city}_{job.date}.parquet"
+
+def run_job(job: BatchJob, out_dir: Path = SCORED_DIR, force: bool = False,
+            budget_seconds: float = BATCH_BUDGET_SECONDS) -> Dict[str, Any]:
+    """
+    download -> load_data -> clean_data -> price model -> clustering -> scoring for one
+    city snapshot. Writes the scored Parquet file and publishes the same frame for the
+    app (attach_scored). Never raises; failures are reported in the result.
+    """
+    # imported here so the parent process stays light and each worker loads them once
+    from src.downloader import download_dataset
+    from src.data_preprocessing import load_data, clean_data
+    from src.dataset_profile import build_profile
+    from src.listing_schema import compact_listings
+    from src.pipelines.analysis import run_analysis
+    from src.snapshot_store import file_fingerprint, load_or_build, publish_scored
+
+    result: Dict[str, Any] = {"job": job.name, "city": job.city, "date": job.date, "status": "failed"}
+    timings: Dict[str, float] = {}
+    try:
+        t0 = time.perf_counter()
+        files = download_dataset(job.version, city=job.city, date=job.date, force=force)
+        timings["download"] = time.perf_counter() - t0
+        if not files.get("listings"):
+            raise RuntimeError(f"Listings download failed: {files.get('status_info')}")
+
+        t0 = time.perf_counter()
+        sources = [files["listings"], files["reviews"]]
+        source_hash = file_fingerprint(sources)
+        df = load_or_build(
+            job.city,
+            job.date,
+            sources,
+            lambda: clean_data(load_data(files["listings"], files["reviews"], files.get("neighbourhoods"))),
+            source_hash=source_hash
+        )
+        df, memory = compact_listings(df)
+        # role column sketches; run_batch merges them into all-city quantiles
+        sketches = {r: s.sketch.to_dict() for r, s in build_profile(df, columns=[]).role_stats.items() if s.sketch}
+        timings["load"] = time.perf_counter() - t0
+
+        df, analysis = run_analysis(df, city=job.city, date=job.date, budget_seconds=budget_seconds)
+        timings.update({k: v for k, v in analysis.items() if k != "total"})
+
+        t0 = time.perf_counter()
+        out_dir.mkdir(parents=True, exist_ok=True)
+        out = scored_output_path(job, out_dir)
+        with atomic_path(out) as tmp:
+            df.to_parquet(tmp, index=False)
+        publish_scored(df, job.city, job.date, source_hash)
+        timings["write"] = time.perf_counter() - t0
+
+        result.update(status="ok", rows=len(df), output=str(out), source_hash=source_hash,
+                      memory_bytes=memory.bytes_after, sketches=sketches)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["timings"] = timings
+    return result
+
+def merge_sketches(results: Sequence[Dict[str, Any]]) -> Dict[str, QuantileSketch]:
+    """Per-role sketches of every successful job merged into one sketch per role."""
+    merged: Dict[str, QuantileSketch] = {}
+    for res in results:
+        for role, data in (res.get("sketches") or {}).items():
+            merged.setdefault(role, QuantileSketch()).merge(QuantileSketch.from_dict(data))
+    return merged
+
+def run_batch(jobs: Sequence[BatchJob], workers: int = BATCH_WORKERS, out_dir: Path = SCORED_DIR,
+              force: bool = False, budget_seconds: float = BATCH_BUDGET_SECONDS) -> Dict[str, Any]:
+    """
+    Runs jobs across a process pool and writes run_report_<timestamp>.json next to the
+    outputs, including all-city quantiles per role column and price bands.
+    """
+    from src.dataset_profile import PRICE_BANDS, PROFILE_QUANTILES
+    started = datetime.utcnow()
+    t0 = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_job, job, out_dir, force, budget_seconds): job for job in jobs}
+        for fut in as_completed(futures):
+            try:
+                res = fut.result()
+            except Exception as e:  # worker died (e.g. out of memory)
+                res = {"job": futures[fut].name, "status": "failed", "error": f"{type(e).__name__}: {e}"}
+            results.append(res)
+            print(f"[{res['status']}] {res['job']} {res.get('error', '')}".rstrip(), flush=True)
+    results.sort(key=lambda r: r["job"])
+    sketches = merge_sketches(results)
+    for res in results:
+        res.pop("sketches", None)
+    quantiles = {
+        role: {str(q): float(v) for q, v in zip(PROFILE_QUANTILES, sk.quantiles(PROFILE_QUANTILES))}
+        for role, sk in sketches.items() if sk.count
+    }
+    price = sketches.get("price")
+    price_bands = {
+        band: [price.min if lo is None else price.quantile(lo), price.max if hi is None else price.quantile(hi)]
+        for band, (lo, hi) in PRICE_BANDS.items()
+    } if price is not None and price.count else {}
+    report = {
+        "started_at": started.isoformat(timespec="seconds") + "Z",
+        "elapsed_seconds": round(time.perf_counter() - t0, 2),
+        "workers": workers,
+        "jobs": len(results),
+        "succeeded": sum(r["status"] == "ok" for r in results),
+        "failed": sum(r["status"] != "ok" for r in results),
+        "quantiles": quantiles,
+        "price_bands": price_bands,
+        "results": results,
+    }
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / f"run_report_{started.strftime('%Y%m%d%H%M%S')}.json"
+    path.write_text(json.dumps(report, indent=2, default=str), encoding="utf-8")
+    report["report_path"] = str(path)
+    return report
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Precompute scored listings for InsideAirbnb cities.")
+    parser.add_argument("--country", action="append", help="Country slug from the catalog (repeatable)")
+    parser.add_argument("--city", action="append", help="City slug from the catalog (repeatable)")
+    parser.add_argument("--all-dates", action="store_true", help="Every snapshot date, not only the latest")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS)
+    parser.add_argument("--out", type=Path, default=SCORED_DIR)
+    parser.add_argument("--force", action="store_true", help="Revalidate cached downloads")
+    parser.add_argument("--budget", type=float, default=BATCH_BUDGET_SECONDS, help="Clustering budget per city (s)")
+    parser.add_argument("--list", action="store_true", help="Only print the selected jobs")
+    args = parser.parse_args(argv)
+
+    jobs = select_jobs(scrape_catalog(), args.country, args.city, args.all_dates)
+    if not jobs:
+        print("No catalog entries match the selection.", file=sys.stderr)
+        return 2
+    if args.list:
+        for job in jobs:
+            print(job.name)
+        return 0
+    report = run_batch(jobs, args.workers, args.out, args.force, args.budget)
+    print(f"{report['succeeded']}/{report['jobs']} cities scored in {report['elapsed_seconds']}s; "
+          f"report: {report['report_path']}")
+    return 0 if report["failed"] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,59 +1,103 @@
 from __future__ import annotations
+from dataclasses import dataclass, field
 from typing import List, Dict, Callable
 import pandas as pd
 import numpy as np
 
-def block_value_metrics(df: pd.DataFrame) -> pd.DataFrame:
-    out = df[["id", "price", "accommodates"]].copy()
-    if "accommodates" in out.columns:
-        out["price_per_person"] = out.apply(
-            lambda r: r["price"] / r["accommodates"] if r.get("accommodates", 0) not in (0, None, np.nan) else np.nan,
-            axis=1
-        )
-    out["value_z"] = (out["price"] - out["price"].mean()) / (out["price"].std(ddof=0) or 1)
+# Every block reads whole columns as float arrays and returns new columns as arrays
+# aligned with the input rows (same length and order), so no join on id is needed.
+BlockOutput = Dict[str, np.ndarray]
+
+REVIEW_QUALITY_COLUMNS = ["review_scores_rating", "review_scores_value", "review_scores_cleanliness"]
+
+def _values(df: pd.DataFrame, col: str) -> np.ndarray:
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+
+def _zscore(x: np.ndarray) -> np.ndarray:
+    # NaN-skipping mean / population std like pandas; a zero spread divides by 1
+    valid = x[~np.isnan(x)]
+    if not len(valid):
+        return np.full(len(x), np.nan)
+    std = valid.std()
+    return (x - valid.mean()) / (std or 1)
+
+def block_value_metrics(df: pd.DataFrame) -> BlockOutput:
+    if "price" not in df.columns:
+        return {}
+    price = _values(df, "price")
+    out: BlockOutput = {}
+    if "accommodates" in df.columns:
+        acc = _values(df, "accommodates")
+        usable = ~np.isnan(acc) & (acc != 0)
+        out["price_per_person"] = np.divide(price, acc, out=np.full(len(price), np.nan), where=usable)
+    out["value_z"] = _zscore(price)
     out["value_score_raw"] = -out["value_z"]
-    return out[["id", "price_per_person", "value_z", "value_score_raw"]]
+    return out
 
-def block_amenities_metrics(df: pd.DataFrame) -> pd.DataFrame:
+def block_amenities_metrics(df: pd.DataFrame) -> BlockOutput:
     if "amenities_count" not in df.columns:
-        return pd.DataFrame({"id": df["id"]})
-    out = df[["id", "amenities_count"]].copy()
-    out["amenities_score_raw"] = (out["amenities_count"] - out["amenities_count"].mean()) / (
-        out["amenities_count"].std(ddof=0) or 1
-    )
-    return out
+        return {}
+    return {"amenities_score_raw": _zscore(_values(df, "amenities_count"))}
 
-def block_review_quality(df: pd.DataFrame) -> pd.DataFrame:
-    candidates = [c for c in ["review_scores_rating", "review_scores_value", "review_scores_cleanliness"] if c in df.columns]
-    base_cols = ["id"] + candidates
-    out = df[base_cols].copy()
-    if candidates:
-        out["review_quality_score_raw"] = out[candidates].mean(axis=1) / 100.0
-    return out
+def block_review_quality(df: pd.DataFrame) -> BlockOutput:
+    candidates = [c for c in REVIEW_QUALITY_COLUMNS if c in df.columns]
+    if not candidates:
+        return {}
+    scores = np.column_stack([_values(df, c) for c in candidates])
+    present = ~np.isnan(scores)
+    # row mean over the scores that are present; NaN when a row has none
+    n = present.sum(axis=1)
+    total = np.where(present, scores, 0.0).sum(axis=1)
+    mean = np.divide(total, n, out=np.full(len(n), np.nan), where=n > 0)
+    return {"review_quality_score_raw": mean / 100.0}
 
-def block_availability(df: pd.DataFrame) -> pd.DataFrame:
+def block_availability(df: pd.DataFrame) -> BlockOutput:
     if "availability_365" not in df.columns:
-        return pd.DataFrame({"id": df["id"]})
-    out = df[["id", "availability_365"]].copy()
-    mean_av = out["availability_365"].mean()
-    out["availability_dev"] = (out["availability_365"] - mean_av).abs()
-    out["availability_score_raw"] = -out["availability_dev"]
-    return out
+        return {}
+    av = _values(df, "availability_365")
+    dev = np.abs(av - np.nanmean(av)) if (~np.isnan(av)).any() else np.full(len(av), np.nan)
+    return {"availability_dev": dev, "availability_score_raw": -dev}
 
-AVAILABLE_BLOCKS: Dict[str, Callable[[pd.DataFrame], pd.DataFrame]] = {
+AVAILABLE_BLOCKS: Dict[str, Callable[[pd.DataFrame], BlockOutput]] = {
     "value_metrics": block_value_metrics,
     "amenities_metrics": block_amenities_metrics,
     "review_quality": block_review_quality,
     "availability_metrics": block_availability
 }
 
-def compute_feature_blocks(df: pd.DataFrame, selected: List[str]) -> List[pd.DataFrame]:
-    outputs = []
-    for blk in selected:
-        func = AVAILABLE_BLOCKS.get(blk)
-        if func:
-            try:
-                outputs.append(func(df))
-            except Exception:
-                pass
-    return outputs
\ No newline at end of file
+@dataclass
+class FeatureBlock:
+    """
+    A block with the columns it reads (`inputs` required, `optional_inputs` used when
+    present) and writes. Bump `version` whenever the block's output changes so
+    cached results are not reused.
+    """
+    name: str
+    func: Callable[[pd.DataFrame], BlockOutput]
+    inputs: List[str]
+    outputs: List[str]
+    optional_inputs: List[str] = field(default_factory=list)
+    version: int = 1
+
+BLOCK_SPECS: Dict[str, FeatureBlock] = {
+    "value_metrics": FeatureBlock(
+        "value_metrics", block_value_metrics, ["price"], ["price_per_person", "value_z", "value_score_raw"],
+        optional_inputs=["accommodates"], version=2
+    ),
+    "amenities_metrics": FeatureBlock(
+        "amenities_metrics", block_amenities_metrics, ["amenities_count"], ["amenities_score_raw"], version=2
+    ),
+    "review_quality": FeatureBlock(
+        "review_quality", block_review_quality, [], ["review_quality_score_raw"],
+        optional_inputs=REVIEW_QUALITY_COLUMNS, version=2
+    ),
+    "availability_metrics": FeatureBlock(
+        "availability_metrics", block_availability, ["availability_365"],
+        ["availability_dev", "availability_score_raw"], version=2
+    ),
+}
+
+def compute_feature_blocks(df: pd.DataFrame, selected: List[str]) -> pd.DataFrame:
+    """The selected blocks' columns as one table aligned with df (uncached; see FeatureStore)."""
+    from src.pipelines.feature_store import FeatureStore
+    return FeatureStore(max_entries=0).compute(df, [b for b in selected if b in BLOCK_SPECS]).frame
@@ -0,0 +1,157 @@
+from __future__ import annotations
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from src.pipelines.feature_blocks import BLOCK_SPECS, BlockOutput, FeatureBlock
+
+FEATURE_WORKERS = 4
+FEATURE_CACHE_ENTRIES = 64
+
+@dataclass
+class FeatureResult:
+    """One compute() call: the aligned columns, and which blocks ran / were skipped."""
+    frame: pd.DataFrame
+    computed: List[str] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+
+class FeatureStore:
+    """
+    Runs feature blocks as a dependency graph (a block depends on the blocks that
+    output one of its input columns) and caches every block's output under
+    (block name, block version, fingerprints of the input columns it read). Blocks
+    whose dependencies are done run concurrently in a thread pool. compute() returns
+    the selected blocks' columns as one table aligned with the input frame, so
+    selecting one more block computes only that block.
+    Blocks missing a required input are skipped (FeatureResult.skipped); block errors
+    propagate. The store may be shared between threads/sessions, so per-call state
+    lives in the returned FeatureResult, never on the instance.
+    """
+
+    def __init__(self, specs: Optional[Dict[str, FeatureBlock]] = None, max_workers: int = FEATURE_WORKERS,
+                 max_entries: int = FEATURE_CACHE_ENTRIES):
+        self.specs = BLOCK_SPECS if specs is None else specs
+        self.max_workers = max_workers
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[Tuple, BlockOutput]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _producers(self) -> Dict[str, str]:
+        return {col: name for name, spec in self.specs.items() for col in spec.outputs}
+
+    def _plan(self, selected: Sequence[str]) -> List[str]:
+        """Selected blocks plus the blocks they depend on, dependencies first."""
+        producers = self._producers()
+        order: List[str] = []
+        visiting = set()
+
+        def visit(name: str) -> None:
+            if name in order:
+                return
+            if name in visiting:
+                raise ValueError(f"Feature block cycle at '{name}'")
+            visiting.add(name)
+            for col in self.specs[name].inputs + self.specs[name].optional_inputs:
+                dep = producers.get(col)
+                if dep and dep != name:
+                    visit(dep)
+            visiting.discard(name)
+            order.append(name)
+
+        for name in selected:
+            if name not in self.specs:
+                raise KeyError(f"Unknown feature block: {name}")
+            visit(name)
+        return order
+
+    def _get(self, key: Tuple) -> Optional[BlockOutput]:
+        with self._lock:
+            out = self._cache.get(key)
+            if out is not None:
+                self._cache.move_to_end(key)
+            return out
+
+    def _put(self, key: Tuple, out: BlockOutput) -> None:
+        for arr in out.values():
+            arr.setflags(write=False)  # shared between callers
+        with self._lock:
+            self._cache[key] = out
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def compute(self, df: pd.DataFrame, selected: Sequence[str], fingerprint: Optional[str] = None) -> FeatureResult:
+        """
+        `fingerprint` identifies df's content (e.g. a snapshot hash); without it each
+        input column is hashed once per call.
+        """
+        plan = self._plan(selected)
+        producers = self._producers()
+        col_fps: Dict[str, str] = {}
+        results: Dict[str, BlockOutput] = {}
+        keys: Dict[str, Tuple] = {}
+        computed: List[str] = []
+        skipped: List[str] = []
+
+        def column_fp(col: str) -> str:
+            if col in producers and producers[col] in keys:
+                return repr(keys[producers[col]])
+            if col not in col_fps:
+                if fingerprint is not None:
+                    col_fps[col] = f"{fingerprint}:{col}"
+                else:
+                    h = pd.util.hash_pandas_object(df[col], index=False).to_numpy()
+                    col_fps[col] = hashlib.sha256(h.tobytes()).hexdigest()[:16]
+            return col_fps[col]
+
+        def available(col: str) -> bool:
+            return col in df.columns or (col in producers and col in results.get(producers[col], {}))
+
+        def frame_for(spec: FeatureBlock) -> pd.DataFrame:
+            cols = [c for c in spec.inputs + spec.optional_inputs if available(c)]
+            extra = {c: results[producers[c]][c] for c in cols if c not in df.columns}
+            base = df[[c for c in cols if c in df.columns]]
+            return base.assign(**extra) if extra else base
+
+        pending = list(plan)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending:
+                ready = [
+                    n for n in pending
+                    if all(producers.get(c) in (None, n) or producers[c] in results or producers[c] in skipped
+                           for c in self.specs[n].inputs + self.specs[n].optional_inputs)
+                ]
+                if not ready:
+                    raise RuntimeError(f"Unresolvable feature block dependencies: {pending}")
+                futures = {}
+                for name in ready:
+                    pending.remove(name)
+                    spec = self.specs[name]
+                    if not all(available(c) for c in spec.inputs):
+                        skipped.append(name)
+                        continue
+                    used = [c for c in spec.inputs + spec.optional_inputs if available(c)]
+                    key = (name, spec.version, len(df), tuple((c, column_fp(c)) for c in used))
+                    keys[name] = key
+                    cached = self._get(key)
+                    if cached is not None:
+                        results[name] = cached
+                    else:
+                        futures[name] = pool.submit(spec.func, frame_for(spec))
+                for name, fut in futures.items():
+                    out = {c: np.asarray(v) for c, v in fut.result().items()}
+                    self._put(keys[name], out)
+                    results[name] = out
+                    computed.append(name)
+
+        columns: Dict[str, np.ndarray] = {}
+        for name in selected:
+            columns.update(results.get(name, {}))
+        return FeatureResult(pd.DataFrame(columns, index=df.index), computed, skipped)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 import json
 from pathlib import Path
 
@@ -29,4 +29,19 @@ def load_profile(name: str):
     if not p.exists():
         return None
     with p.open("r", encoding="utf-8") as f:
-        return json.load(f)
\ No newline at end of file
+        return json.load(f)
+
+def profile_weights(data: Optional[Dict[str, Any]]) -> Dict[str, float]:
+    """Score weights of a saved profile (a {"weights": {...}} entry or the weights themselves)."""
+    data = (data or {}).get("weights", data or {})
+    return {k: float(data[k]) if isinstance(data.get(k), (int, float)) else v for k, v in DEFAULT_WEIGHTS.items()}
+
+def profile_rankings(model, k: int = 10, names: Optional[List[str]] = None, mask=None) -> Dict[str, List]:
+    """
+    Top-k listing ids per saved profile (plus "default") from a scoring.ScoreModel.
+    Each ranking is one mat-vec product over the model's cached component matrix.
+    """
+    names = list_profiles() if names is None else names
+    profiles = {"default": dict(DEFAULT_WEIGHTS)}
+    profiles.update({name: profile_weights(load_profile(name)) for name in names})
+    return {name: list(ids) for name, ids in model.rankings(profiles, k, mask).items()}
@@ -1,41 +1,82 @@
 from __future__ import annotations
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
+import numpy as np
 import pandas as pd
+from src.quantile_sketch import robust_bounds
+
+# (feature block, raw score column, weight key, reason label) per score component
+COMPONENTS: List[Tuple[str, str, str, str]] = [
+    ("value_metrics", "value_score_raw", "value", "value"),
+    ("amenities_metrics", "amenities_score_raw", "amenities", "amenities"),
+    ("review_quality", "review_quality_score_raw", "reviews", "reviews"),
+    ("availability_metrics", "availability_score_raw", "availability", "availability"),
+]
 
 def _normalize_series(s: pd.Series) -> pd.Series:
     if s.empty:
         return s
-    rng = s.max() - s.min()
-    if rng == 0:
+    lo, hi = robust_bounds(s.to_numpy(dtype=float, na_value=np.nan))
+    if np.isnan(lo):
+        return s.astype(float)
+    if hi == lo:
         return pd.Series(0.5, index=s.index)
-    return (s - s.min()) / rng
+    return (s.clip(lo, hi) - lo) / (hi - lo)
+
+def active_components(df: pd.DataFrame, blocks: List[str]) -> List[Tuple[str, str, str, str]]:
+    return [c for c in COMPONENTS if c[0] in blocks and c[1] in df.columns]
+
+def normalize_columns(matrix: np.ndarray) -> np.ndarray:
+    """
+    Scales every column of a float32 matrix in place to [0, 1] between its robust
+    bounds (1st / 99th percentile), clipping outliers;
+    constant columns become 0.5 and missing values 0 (what _normalize_series followed
+    by a NaN-skipping row sum gives).
+    """
+    if matrix.size == 0:
+        return matrix
+    bounds = [robust_bounds(matrix[:, j]) for j in range(matrix.shape[1])]
+    lo, hi = (np.array(b, dtype=matrix.dtype) for b in zip(*bounds))
+    np.clip(matrix, lo, hi, out=matrix)
+    rng = hi - lo
+    constant = rng == 0
+    scale = np.divide(1.0, rng, out=np.zeros_like(rng), where=np.isfinite(rng) & ~constant)
+    matrix -= np.where(np.isfinite(lo), lo, 0)
+    matrix *= scale
+    np.nan_to_num(matrix, copy=False, nan=0.0)
+    matrix[:, constant] = 0.5
+    return matrix
+
+def component_matrix(df: pd.DataFrame, blocks: List[str]) -> Tuple[List[str], np.ndarray]:
+    """Weight keys and the n x k float32 matrix of normalized component scores."""
+    comps = active_components(df, blocks)
+    matrix = np.empty((len(df), len(comps)), dtype=np.float32, order="F")  # contiguous columns
+    for j, (_, col, _, _) in enumerate(comps):
+        matrix[:, j] = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float32)
+    return [c[2] for c in comps], normalize_columns(matrix)
+
+def weight_vector(keys: List[str], weights: Dict[str, float]) -> np.ndarray:
+    return np.array([weights.get(k, 1.0) for k in keys], dtype=np.float32)
+
+def weighted_total(matrix: np.ndarray, keys: List[str], weights: Dict[str, float]) -> np.ndarray:
+    """The re-weighting step alone: one matrix-vector product."""
+    return matrix @ weight_vector(keys, weights)
 
 def build_dynamic_scores(
     df: pd.DataFrame,
     weights: Dict[str, float],
-    blocks: List[str]
+    blocks: List[str],
+    matrix: Optional[Tuple[List[str], np.ndarray]] = None
 ) -> pd.DataFrame:
-    val_col = "value_score_raw" if "value_metrics" in blocks and "value_score_raw" in df.columns else None
-    amen_col = "amenities_score_raw" if "amenities_metrics" in blocks and "amenities_score_raw" in df.columns else None
-    rev_col = "review_quality_score_raw" if "review_quality" in blocks and "review_quality_score_raw" in df.columns else None
-    avail_col = "availability_score_raw" if "availability_metrics" in blocks and "availability_score_raw" in df.columns else None
-
-    component_scores = []
-    if val_col:
-        df["dynamic_value_score"] = _normalize_series(df[val_col]) * weights.get("value", 1.0)
-        component_scores.append("dynamic_value_score")
-    if amen_col:
-        df["dynamic_amenities_score"] = _normalize_series(df[amen_col]) * weights.get("amenities", 1.0)
-        component_scores.append("dynamic_amenities_score")
-    if rev_col:
-        df["dynamic_review_quality_score"] = _normalize_series(df[rev_col]) * weights.get("reviews", 1.0)
-        component_scores.append("dynamic_review_quality_score")
-    if avail_col:
-        df["dynamic_availability_score"] = _normalize_series(df[avail_col]) * weights.get("availability", 1.0)
-        component_scores.append("dynamic_availability_score")
-
-    if component_scores:
-        df["total_score_dynamic"] = df[component_scores].sum(axis=1)
+    """
+    Adds total_score_dynamic (weighted sum of the normalized block scores) and blends
+    it into total_score. Pass a precomputed `matrix` (component_matrix(df, blocks)) to
+    re-weight without normalizing again.
+    """
+    comps = active_components(df, blocks)
+    keys, m = matrix if matrix is not None else component_matrix(df, blocks)
+
+    if comps:
+        df["total_score_dynamic"] = weighted_total(m, keys, weights).astype(float)
         if "total_score" in df.columns:
             df["total_score"] = (df["total_score"] + df["total_score_dynamic"]) / 2.0
         else:
@@ -44,10 +85,70 @@ def build_dynamic_scores(
         if "total_score" not in df.columns:
             df["total_score"] = 0.0
 
-    reasons = []
-    if val_col: reasons.append("value")
-    if amen_col: reasons.append("amenities")
-    if rev_col: reasons.append("reviews")
-    if avail_col: reasons.append("availability")
-    df["recommendation_reason"] = " + ".join(reasons) if reasons else "baseline"
-    return df
\ No newline at end of file
+    reasons = [c[3] for c in comps]
+    if "recommendation_reason" not in df.columns:  # keep per-listing reasons from build_recommendation_scores
+        df["recommendation_reason"] = " + ".join(reasons) if reasons else "baseline"
+    return df
+
+class ScoreModel:
+    """
+    Normalized component matrix of one dataset (see component_matrix) plus the base
+    total_score it is blended with, so re-weighting and re-filtering are a mat-vec
+    product and a partial selection over arrays. No DataFrame is built per call.
+    rescore() gives the same values as build_dynamic_scores' total_score.
+    """
+
+    def __init__(self, keys: List[str], matrix: np.ndarray, base: Optional[np.ndarray] = None,
+                 ids: Optional[np.ndarray] = None):
+        self.keys = keys
+        self.matrix = matrix
+        self.base = base
+        self.ids = np.arange(len(matrix)) if ids is None else ids
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, blocks: List[str], features: Optional[pd.DataFrame] = None) -> "ScoreModel":
+        """`features` holds the raw component columns when they are not in df (FeatureStore output)."""
+        keys, matrix = component_matrix(df if features is None else features, blocks)
+        base = None
+        if "total_score" in df.columns:
+            base = pd.to_numeric(df["total_score"], errors="coerce").to_numpy(dtype=np.float32)
+        ids = df["id"].to_numpy() if "id" in df.columns else None
+        return cls(keys, matrix, base, ids)
+
+    def __len__(self) -> int:
+        return len(self.matrix)
+
+    def rescore(self, weights: Dict[str, float], rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Scores of every row (or of `rows` positions only) under `weights`."""
+        m = self.matrix if rows is None else self.matrix[rows]
+        base = self.base if rows is None or self.base is None else self.base[rows]
+        if not self.keys:
+            return base.copy() if base is not None else np.zeros(len(m), dtype=np.float32)
+        dyn = weighted_total(m, self.keys, weights)
+        return dyn if base is None else (base + dyn) / 2
+
+    def topk(self, weights: Dict[str, float], k: int, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Positions of the k best rows under `weights`, best first, ties broken by id.
+        `mask` is a boolean row mask or an array of allowed positions (filter output).
+        """
+        if mask is None:
+            cand = np.arange(len(self))
+        else:
+            mask = np.asarray(mask)
+            cand = np.flatnonzero(mask) if mask.dtype == bool else mask
+        if k <= 0 or len(cand) == 0:
+            return cand[:0]
+        scores = self.rescore(weights, cand)
+        scores = np.where(np.isnan(scores), -np.inf, scores)
+        if k < len(cand):
+            kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+            keep = scores >= kth  # keeps every row tied with the k-th score
+            cand, scores = cand[keep], scores[keep]
+        order = np.lexsort([self.ids[cand], -scores])
+        return cand[order[:k]]
+
+    def rankings(self, profiles: Dict[str, Dict[str, float]], k: int = 10,
+                 mask: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """Top-k ids for each named weight profile."""
+        return {name: self.ids[self.topk(w, k, mask)] for name, w in profiles.items()}
@@ -0,0 +1,75 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, MutableMapping, Optional, Tuple
+import hashlib
+
+@dataclass
+class Stage:
+    name: str
+    func: Callable[..., Any]
+    deps: List[str] = field(default_factory=list)
+    params: List[str] = field(default_factory=list)
+
+def _digest(*parts: Any) -> str:
+    return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()[:16]
+
+class StageGraph:
+    """
+    Memoized pipeline stages. A stage's fingerprint is a hash of its name, its
+    upstream fingerprints and the values of the parameters it reads, so changing
+    one parameter only reruns the stages that (transitively) depend on it.
+    `store` keeps the latest (fingerprint, value) per stage; pass
+    st.session_state[...] to keep results across Streamlit reruns.
+    Parameters must have a stable repr (tuples, numbers, strings, file ids).
+    """
+
+    def __init__(self, store: Optional[MutableMapping[str, Tuple[str, Any]]] = None):
+        self.stages: Dict[str, Stage] = {}
+        self.store: MutableMapping[str, Tuple[str, Any]] = {} if store is None else store
+        self.last_run: List[str] = []
+
+    def add(self, name: str, func: Callable[..., Any], deps: Optional[List[str]] = None,
+            params: Optional[List[str]] = None) -> "StageGraph":
+        """func receives the dependency values positionally, then the params as keywords."""
+        for d in deps or []:
+            if d not in self.stages:
+                raise KeyError(f"Stage '{name}' depends on unknown stage '{d}'")
+        self.stages[name] = Stage(name, func, list(deps or []), list(params or []))
+        return self
+
+    def fingerprint(self, name: str, params: Dict[str, Any]) -> str:
+        stage = self.stages[name]
+        return _digest(
+            name,
+            [self.fingerprint(d, params) for d in stage.deps],
+            [(p, params.get(p)) for p in stage.params],
+        )
+
+    def run(self, name: str, params: Dict[str, Any]) -> Any:
+        """Returns the stage's value, computing it and any stale upstream stages."""
+        if name not in self.stages:
+            raise KeyError(f"Unknown stage: {name}")
+        self.last_run = []
+        return self._run(name, params, {})
+
+    def _run(self, name: str, params: Dict[str, Any], seen: Dict[str, Any]) -> Any:
+        if name in seen:
+            return seen[name]
+        stage = self.stages[name]
+        fp = self.fingerprint(name, params)
+        cached = self.store.get(name)
+        if cached is not None and cached[0] == fp:
+            seen[name] = cached[1]
+            return cached[1]
+        inputs = [self._run(d, params, seen) for d in stage.deps]
+        value = stage.func(*inputs, **{p: params.get(p) for p in stage.params})
+        self.store[name] = (fp, value)
+        self.last_run.append(name)
+        seen[name] = value
+        return value
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        if name is None:
+            self.store.clear()
+        else:
+            self.store.pop(name, None)
@@ -1,17 +1,83 @@
 from __future__ import annotations
-import math
 import numpy as np
 import pandas as pd
 from typing import List, Optional
+from src.spatial_index import SpatialIndex
+from src.filter_index import ListingFilterIndex
+from src.amenities import parse_amenities
+from src.amenity_index import AmenityIndex
+from src.quantile_sketch import robust_bounds
+
+OCCUPANCY_GROUPS = {
+    "Solo (1)": (1,1),
+    "Duo (2)": (2,2),
+    "Small group (3-4)": (3,4),
+    "Family (5-6)": (5,6),
+    "Large (7+)": (7, 99)
+}
 
 def _norm(series):
+    # scaled between the 1st / 99th percentiles (see robust_bounds) and clipped to [0, 1]
+    # accepts a Series or an array (the zero components of frames without review columns)
     if series is None or len(series) == 0:
-        return np.zeros(len(series))
-    s = series.astype(float)
-    mn, mx = s.min(), s.max()
-    if mx == mn:
+        return np.zeros(0)
+    s = np.asarray(series, dtype=float)
+    lo, hi = robust_bounds(s)
+    if not hi > lo:
         return np.zeros(len(s))
-    return (s - mn) / (mx - mn)
+    return (np.clip(s, lo, hi) - lo) / (hi - lo)
+
+def _numeric(df: pd.DataFrame, col: str) -> np.ndarray:
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+
+def _append_reason(acc: np.ndarray, mask: np.ndarray, text) -> None:
+    # text is a single str or one str per masked row
+    if not mask.any():
+        return
+    part = np.asarray(text, dtype=object)
+    cur = acc[mask]
+    acc[mask] = np.where(cur == "", part, cur + "; " + part)
+
+def _build_reasons(df: pd.DataFrame, reviews_col: Optional[str]) -> np.ndarray:
+    """
+    Column-wise version of the per-row reason builder: each tier is a boolean mask
+    and its text is appended to every masked row at once.
+    """
+    acc = np.full(len(df), "", dtype=object)
+
+    if "predicted_price" in df.columns and "price" in df.columns:
+        price = _numeric(df, "price")
+        pred = _numeric(df, "predicted_price")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pct = np.where(price != 0, (pred - price) / price * 100, 0.0)
+        pct[np.isnan(price)] = np.nan
+        under, over = pct > 8, pct < -8
+        _append_reason(acc, under, np.char.mod("~%.0f%% undervalued", pct[under]))
+        _append_reason(acc, over, np.char.mod("%.0f%% premium", np.abs(pct[over])))
+
+    if reviews_col:
+        revs = _numeric(df, reviews_col)
+        many = revs > 50
+        _append_reason(acc, many, np.char.add(revs[many].astype(np.int64).astype(str), " reviews"))
+        _append_reason(acc, ~many & (revs > 10), "solid reviews")
+
+    if "review_scores_rating" in df.columns:
+        rating = _numeric(df, "review_scores_rating")
+        _append_reason(acc, rating >= 95, "excellent rating")
+        _append_reason(acc, (rating >= 90) & (rating < 95), "strong rating")
+
+    if "amenities_count" in df.columns:
+        amen = _numeric(df, "amenities_count")
+        _append_reason(acc, amen >= 20, "rich amenities")
+        _append_reason(acc, (amen >= 10) & (amen < 20), "good amenities")
+
+    if "availability_365" in df.columns:
+        av = _numeric(df, "availability_365")
+        _append_reason(acc, (av >= 60) & (av <= 250), "balanced availability")
+        _append_reason(acc, av < 30, "limited availability")
+
+    acc[acc == ""] = "meets criteria"
+    return acc
 
 def build_recommendation_scores(df: pd.DataFrame) -> pd.DataFrame:
     df = df.copy()
@@ -41,7 +107,8 @@ def build_recommendation_scores(df: pd.DataFrame) -> pd.DataFrame:
         amenity_richness = np.zeros(len(df))
 
     if "availability_365" in df.columns:
-        avail = df["availability_365"].fillna(0).clip(0,365)
+        # float first: compacted frames store availability as int16, where (365 - 180) ** 2 wraps
+        avail = df["availability_365"].astype(float).fillna(0).clip(0,365)
         availability_score = 1 - ((avail - 180) ** 2) / (180 ** 2)
         availability_score = availability_score.clip(lower=0)
     else:
@@ -61,48 +128,121 @@ def build_recommendation_scores(df: pd.DataFrame) -> pd.DataFrame:
     df["score_availability"] = availability_score
     df["total_score"] = total_score
 
-    reasons = []
-    for _, row in df.iterrows():
-        r_parts = []
-        if "predicted_price" in row and "price" in row and not math.isnan(row["price"]):
-            diff = row["predicted_price"] - row["price"]
-            pct = diff / row["price"] * 100 if row["price"] else 0
-            if pct > 8:
-                r_parts.append(f"~{pct:.0f}% undervalued")
-            elif pct < -8:
-                r_parts.append(f"{abs(pct):.0f}% premium")
-
-        rev_c = reviews_col
-        if rev_c and row.get(rev_c, 0) > 50:
-            r_parts.append(f"{int(row[rev_c])} reviews")
-        elif rev_c and row.get(rev_c, 0) > 10:
-            r_parts.append("solid reviews")
-
-        if "review_scores_rating" in row and not math.isnan(row["review_scores_rating"]):
-            if row["review_scores_rating"] >= 95:
-                r_parts.append("excellent rating")
-            elif row["review_scores_rating"] >= 90:
-                r_parts.append("strong rating")
-
-        if "amenities_count" in row:
-            if row["amenities_count"] >= 20:
-                r_parts.append("rich amenities")
-            elif row["amenities_count"] >= 10:
-                r_parts.append("good amenities")
-
-        if "availability_365" in row:
-            av = row["availability_365"]
-            if 60 <= av <= 250:
-                r_parts.append("balanced availability")
-            elif av < 30:
-                r_parts.append("limited availability")
-
-        if not r_parts:
-            r_parts = ["meets criteria"]
-        reasons.append("; ".join(r_parts))
-    df["recommendation_reason"] = reasons
+    df["recommendation_reason"] = _build_reasons(df, reviews_col)
     return df
 
+def _rank_keys(df: pd.DataFrame, by: List[str]) -> List[np.ndarray]:
+    # descending rank keys; NaN ranks last like sort_values
+    keys = []
+    for col in by:
+        v = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+        keys.append(np.where(np.isnan(v), -np.inf, v))
+    return keys
+
+def top_k_positions(
+    df: pd.DataFrame,
+    k: int,
+    by="total_score",
+    id_col: str = "id",
+    group_by: Optional[str] = None,
+    mask: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Row positions (for .iloc) of the k best rows by `by` (a column or a list of columns
+    compared in order), highest first, ties broken by ascending `id_col`.
+    Without group_by this is a partial selection (argpartition on the first key plus
+    a sort of the few tied candidates), not a sort of the frame. With group_by the same
+    selection runs within each group and the top k of every group come back together,
+    groups in order of first appearance.
+    `mask` restricts the candidates: a bool mask over the rows or an array of row
+    positions (e.g. the output of ListingFilterIndex.query).
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    keys = _rank_keys(df, by)
+    ids = df[id_col].to_numpy() if id_col in df.columns else np.arange(len(df))
+    cand = _candidate_positions(mask, len(df))
+    if k <= 0 or len(cand) == 0:
+        return cand[:0]
+
+    if group_by is None:
+        cand = _partial_top(cand, keys[0], k)
+        order = np.lexsort([ids[cand]] + [-key[cand] for key in reversed(keys)])
+        return cand[order[:k]]
+
+    codes = pd.factorize(df[group_by].to_numpy()[cand], use_na_sentinel=False)[0]
+    # group members via pandas' counting-sort grouper, then a partial selection per group
+    groups = pd.Series(codes).groupby(codes, sort=False).indices
+    first = keys[0][cand]
+    local = np.concatenate([_partial_top(i, first, k) for i in groups.values()])
+    keep, keep_codes = cand[local], codes[local]
+    order = np.lexsort([ids[keep]] + [-key[keep] for key in reversed(keys)] + [keep_codes])
+    sorted_codes = keep_codes[order]
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    rank = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    return keep[order[rank < k]]
+
+def _candidate_positions(mask: Optional[np.ndarray], n: int) -> np.ndarray:
+    """Row positions allowed by `mask` (bool mask of length n, or positions)."""
+    if mask is None:
+        return np.arange(n)
+    mask = np.asarray(mask)
+    if mask.size == 0:
+        return np.empty(0, dtype=np.intp)
+    if mask.dtype == bool:
+        if len(mask) != n:
+            raise ValueError(f"mask has {len(mask)} entries for {n} rows")
+        return np.flatnonzero(mask)
+    if mask.dtype.kind not in "iu":
+        raise TypeError(f"mask must be a bool mask or integer positions, not {mask.dtype}")
+    return mask.astype(np.intp, copy=False)
+
+def _partial_top(rows: np.ndarray, first: np.ndarray, k: int) -> np.ndarray:
+    """rows (positions into first) narrowed to those at least as good as the k-th best (ties kept)."""
+    if k >= len(rows):
+        return rows
+    values = first[rows]
+    kth = np.partition(values, len(values) - k)[len(values) - k]
+    return rows[values >= kth]
+
+def _spatial_positions(
+    df: pd.DataFrame,
+    spatial_index: Optional[SpatialIndex],
+    near: Optional[tuple[float,float,float]],
+    bbox: Optional[tuple[float,float,float,float]]
+) -> Optional[np.ndarray]:
+    if not (near or bbox):
+        return None
+    if spatial_index is None:
+        spatial_index = SpatialIndex(df)
+    elif spatial_index.n_rows != len(df):
+        raise ValueError("spatial_index was built for a different frame")
+    pos = None
+    if near:
+        pos = spatial_index.within_radius(*near)
+    if bbox:
+        in_box = spatial_index.within_bbox(*bbox)
+        pos = in_box if pos is None else np.intersect1d(pos, in_box, assume_unique=True)
+    return pos
+
+def _has_amenities(out: pd.DataFrame, required_amenities: List[str]) -> pd.Series:
+    # one-off match on the parsed codes; an AmenityIndex only pays off when it is kept
+    parsed = parse_amenities(out["amenities_list"])
+    code = {a: i for i, a in enumerate(parsed.vocab)}
+    rows = parsed.row_ids()
+    mask = np.ones(len(out), dtype=bool)
+    for a in required_amenities:
+        has = np.zeros(len(out), dtype=bool)
+        has[rows[parsed.codes == code.get(a.strip().lower(), -1)]] = True
+        mask &= has
+    return pd.Series(mask, index=out.index)
+
+def _stars_scale(df: pd.DataFrame) -> float:
+    # Older snapshots rate 0-100, current InsideAirbnb and demo data 0-5.
+    if "review_scores_rating" not in df.columns:
+        return 20.0
+    top = pd.to_numeric(df["review_scores_rating"], errors="coerce").max()
+    return 1.0 if pd.notna(top) and top <= 5 else 20.0
+
 def filter_by_preferences(
     df: pd.DataFrame,
     price_range: Optional[tuple[float,float]] = None,
@@ -114,9 +254,43 @@ def filter_by_preferences(
     required_amenities: Optional[List[str]] = None,
     min_amenities_count: Optional[int] = None,
     min_value_score: Optional[float] = None,
-    max_price_per_person: Optional[float] = None
+    max_price_per_person: Optional[float] = None,
+    spatial_index: Optional[SpatialIndex] = None,
+    near: Optional[tuple[float,float,float]] = None,
+    bbox: Optional[tuple[float,float,float,float]] = None,
+    filter_index: Optional[ListingFilterIndex] = None,
+    as_positions: bool = False
 ) -> pd.DataFrame:
-    out = df.copy()
+    # Location pre-filter: near=(lat, lon, radius_km), bbox=(south, west, north, east).
+    # spatial_index / filter_index must have been built from this same df.
+    # as_positions=True returns the matching row positions in df instead of a frame.
+    pos = _spatial_positions(df, spatial_index, near, bbox)
+
+    if filter_index is not None:
+        if filter_index.n_rows != len(df):
+            raise ValueError("filter_index was built for a different frame")
+        if required_amenities and filter_index.amenities is None:
+            # built without one (build_amenities=False): build it once and keep it on the index
+            filter_index.amenities = AmenityIndex.from_frame(df)
+        hit = filter_index.query(
+            price_range=price_range,
+            reviews_range=reviews_range,
+            rating_range=tuple(s * _stars_scale(df) for s in stars_range) if stars_range else None,
+            availability_range=availability_range,
+            accommodates_range=OCCUPANCY_GROUPS.get(occupancy_group) if occupancy_group else None,
+            room_types=room_types,
+            required_amenities=required_amenities,
+            min_amenities_count=min_amenities_count,
+            min_value_score=min_value_score,
+            max_price_per_person=max_price_per_person
+        )
+        if pos is not None:
+            hit = np.intersect1d(hit, pos, assume_unique=True)
+        return hit if as_positions else df.iloc[hit]
+
+    out = df.iloc[pos].copy() if pos is not None else df.copy()
+    if as_positions:
+        out.index = pos if pos is not None else np.arange(len(df))  # positions ride along as the index
 
     # Price range
     if price_range and "price" in out.columns:
@@ -130,11 +304,12 @@ def filter_by_preferences(
         if rev_col:
             out = out[out[rev_col].fillna(0).between(lo_r, hi_r)]
 
-    # Stars (convert 1–5 to rating 0–100)
+    # Stars (convert 1–5 to rating 0–100 unless ratings are already on a 0–5 scale)
     if stars_range and "review_scores_rating" in out.columns:
         lo_s, hi_s = stars_range
-        lo_real = (lo_s - 0.0) * 20  # inclusive
-        hi_real = hi_s * 20
+        scale = _stars_scale(df)
+        lo_real = (lo_s - 0.0) * scale  # inclusive
+        hi_real = hi_s * scale
         out = out[out["review_scores_rating"].fillna(0).between(lo_real, hi_real)]
 
     # Availability
@@ -144,15 +319,8 @@ def filter_by_preferences(
 
     # Occupancy group
     if occupancy_group and "accommodates" in out.columns:
-        mapping = {
-            "Solo (1)": (1,1),
-            "Duo (2)": (2,2),
-            "Small group (3-4)": (3,4),
-            "Family (5-6)": (5,6),
-            "Large (7+)": (7, 99)
-        }
-        if occupancy_group in mapping:
-            lo_a, hi_a = mapping[occupancy_group]
+        if occupancy_group in OCCUPANCY_GROUPS:
+            lo_a, hi_a = OCCUPANCY_GROUPS[occupancy_group]
             out = out[out["accommodates"].fillna(0).between(lo_a, hi_a)]
 
     # Room types multi-select
@@ -161,12 +329,7 @@ def filter_by_preferences(
 
     # Amenities list
     if required_amenities and "amenities_list" in out.columns:
-        req = [r.lower() for r in required_amenities]
-        mask = []
-        for lst in out["amenities_list"]:
-            st_lower = {x.lower() for x in lst}
-            mask.append(all(r in st_lower for r in req))
-        out = out[pd.Series(mask, index=out.index)]
+        out = out[_has_amenities(out, required_amenities)]
 
     # Minimum amenities count
     if min_amenities_count is not None and "amenities_count" in out.columns:
@@ -181,4 +344,4 @@ def filter_by_preferences(
         ppp = out["price"] / out["accommodates"].replace(0, 1)
         out = out[ppp <= max_price_per_person]
 
-    return out
\ No newline at end of file
+    return out.index.to_numpy() if as_positions else out
\ No newline at end of file
@@ -1,8 +1,12 @@
+import json
 import re
+import threading
+import time
 from dataclasses import dataclass, field
-from typing import Dict, List
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
 import requests
-from bs4 import BeautifulSoup
+from src.utils.safe_io import atomic_path
 
 INSIDE_AIRBNB_INDEX = "https://insideairbnb.com/get-the-data/"
 
@@ -17,6 +21,12 @@ HEADERS = {
 
 LISTING_SUFFIX = "listings.csv.gz"
 DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+# href extraction without building a parse tree; the index is a flat list of anchors
+HREF_RE = re.compile(r"""href\s*=\s*["']\s*([^"'>]*?listings\.csv\.gz)\s*["']""", re.IGNORECASE)
+
+CATALOG_CACHE = Path("data/catalog_cache.json")
+CATALOG_TTL_SECONDS = 24 * 3600
+_refresh_lock = threading.Lock()
 
 @dataclass
 class DatasetVersion:
@@ -40,17 +50,15 @@ def _fetch_index() -> str:
     return r.text
 
 def _extract_listing_links(html: str) -> List[str]:
-    soup = BeautifulSoup(html, "html.parser")
-    links = []
-    for a in soup.find_all("a", href=True):
-        href = a["href"].strip()
-        if href.endswith(LISTING_SUFFIX):
-            if href.startswith("//"):
-                href = "https:" + href
-            elif href.startswith("/"):
-                href = "https://insideairbnb.com" + href
-            links.append(href)
-    return list(set(links))
+    links = set()
+    for href in HREF_RE.findall(html):
+        href = href.replace("&amp;", "&")
+        if href.startswith("//"):
+            href = "https:" + href
+        elif href.startswith("/"):
+            href = "https://insideairbnb.com" + href
+        links.add(href)
+    return list(links)
 
 def _parse(url: str):
     # Expected: .../{country}/{region...}/{city}/{date}/data/listings.csv.gz
@@ -71,10 +79,8 @@ def _parse(url: str):
     region = "/".join(region_segments) if region_segments else "_"
     return country, region, city, date
 
-def scrape_catalog() -> CatalogType:
-    html = _fetch_index()
-    links = _extract_listing_links(html)
-    catalog: CatalogType = {}
+def _add_links(catalog: CatalogType, links: Iterable[str]) -> int:
+    added = 0
     for link in links:
         parsed = _parse(link)
         if not parsed:
@@ -91,7 +97,81 @@ def scrape_catalog() -> CatalogType:
         city_entry = catalog.setdefault(country, {}).setdefault(region, {}).setdefault(
             city, CityCatalog(latest_date=date, versions={})
         )
+        if date not in city_entry.versions:
+            added += 1
         city_entry.versions[date] = version
         if date > city_entry.latest_date:
             city_entry.latest_date = date
-    return catalog
\ No newline at end of file
+    return added
+
+def _catalog_links(catalog: CatalogType) -> List[str]:
+    return sorted(
+        v.listings_url
+        for regions in catalog.values()
+        for cities in regions.values()
+        for entry in cities.values()
+        for v in entry.versions.values()
+    )
+
+def save_catalog(catalog: CatalogType, path: Path = CATALOG_CACHE) -> None:
+    # Only listings links are stored; every other field is derived from them on load.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with atomic_path(path) as tmp:
+        tmp.write_text(
+            json.dumps({"fetched_at": time.time(), "links": _catalog_links(catalog)}, separators=(",", ":")),
+            encoding="utf-8"
+        )
+
+def load_catalog(path: Path = CATALOG_CACHE) -> Optional[Tuple[CatalogType, float]]:
+    """Returns (catalog, fetched_at epoch seconds) from the on-disk cache, or None."""
+    try:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    catalog: CatalogType = {}
+    _add_links(catalog, payload.get("links", []))
+    if not catalog:
+        return None
+    return catalog, float(payload.get("fetched_at", 0))
+
+def refresh_catalog(catalog: Optional[CatalogType] = None, path: Path = CATALOG_CACHE) -> Tuple[CatalogType, int]:
+    """
+    Re-fetches the index and merges versions not yet in `catalog` (or the cached one).
+    Returns (catalog, number of new versions) and rewrites the cache.
+    """
+    if catalog is None:
+        cached = load_catalog(path)
+        catalog = cached[0] if cached else {}
+    known = set(_catalog_links(catalog))
+    fresh = [link for link in _extract_listing_links(_fetch_index()) if link not in known]
+    added = _add_links(catalog, fresh)
+    save_catalog(catalog, path)
+    return catalog, added
+
+def _refresh_in_background(path: Path) -> None:
+    if not _refresh_lock.acquire(blocking=False):
+        return  # a refresh is already running
+
+    def run():
+        try:
+            refresh_catalog(path=path)
+        except Exception:
+            pass  # keep serving the stale cache; next call retries
+        finally:
+            _refresh_lock.release()
+
+    threading.Thread(target=run, name="catalog-refresh", daemon=True).start()
+
+def scrape_catalog(path: Path = CATALOG_CACHE, ttl: float = CATALOG_TTL_SECONDS) -> CatalogType:
+    """
+    Serves the catalog from the on-disk cache when there is one; a cache older than
+    `ttl` seconds is refreshed in a background thread. Only a cold start blocks on the index.
+    """
+    cached = load_catalog(path)
+    if cached is None:
+        catalog, _ = refresh_catalog({}, path)
+        return catalog
+    catalog, fetched_at = cached
+    if time.time() - fetched_at > ttl:
+        _refresh_in_background(path)
+    return catalog
@@ -0,0 +1,170 @@
+from __future__ import annotations
+import hashlib
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+from src.utils.safe_io import atomic_path
+
+PROCESSED_DIR = Path("data/processed")
+PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
+
+HASH_CHUNK_BYTES = 1 << 20
+# Bumped when clean_data output changes so stale processed snapshots are not reused.
+SNAPSHOT_VERSION = 2
+# Bumped when run_analysis output changes (price model, clustering, recommendation
+# scores) so processes do not attach scored frames published by older code.
+# 2: robust percentile normalization; int16 availability widened before scoring.
+SCORED_VERSION = 2
+
+# Columns read back for the model / clustering / scoring / filtering steps and the result tables.
+ANALYSIS_COLUMNS: List[str] = [
+    "id", "name", "host_id", "neighbourhood", "neighbourhood_cleansed", "room_type", "property_type",
+    "price", "latitude", "longitude", "accommodates", "bedrooms", "beds", "minimum_nights",
+    "number_of_reviews", "num_reviews", "reviews_count", "reviews_per_month", "last_review",
+    "last_review_date", "reviews_per_month_est", "avg_review_sentiment",
+    "review_scores_rating", "review_scores_value", "review_scores_cleanliness",
+    "availability_365", "amenities", "amenities_count", "picture_url", "image_url",
+]
+
+def file_fingerprint(paths: Sequence[Optional[Path | str]]) -> str:
+    """
+    Content hash of the raw source files (missing entries are skipped), so a re-downloaded
+    snapshot with different bytes gets a new processed entry.
+    """
+    h = hashlib.sha256()
+    for p in paths:
+        if not p:
+            continue
+        p = Path(p)
+        h.update(p.name.encode("utf-8"))
+        with p.open("rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+                h.update(chunk)
+    return h.hexdigest()[:16]
+
+def snapshot_path(city: str, date: str, source_hash: str) -> Path:
+    return PROCESSED_DIR / f"{city}_{date}_{source_hash}_v{SNAPSHOT_VERSION}.parquet"
+
+def _arrow_safe(df: pd.DataFrame) -> pd.DataFrame:
+    # Parquet needs one type per column; mixed object columns are stored as strings.
+    out = df
+    for col in df.columns:
+        if df[col].dtype != object:
+            continue
+        kind = pd.api.types.infer_dtype(df[col], skipna=True)
+        if kind in ("string", "empty", "boolean", "integer", "floating", "bytes"):
+            continue
+        if out is df:
+            out = df.copy()
+        out[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return out
+
+def save_snapshot(df: pd.DataFrame, city: str, date: str, source_hash: str) -> Path:
+    path = snapshot_path(city, date, source_hash)
+    with atomic_path(path) as tmp:
+        _arrow_safe(df).to_parquet(tmp, index=False)
+    return path
+
+def load_snapshot(
+    city: str,
+    date: str,
+    source_hash: str,
+    columns: Optional[Sequence[str]] = ANALYSIS_COLUMNS
+) -> Optional[pd.DataFrame]:
+    """
+    Memory-maps a processed snapshot and reads only `columns` (those present in the file).
+    Returns None when the snapshot is missing or unreadable.
+    """
+    path = snapshot_path(city, date, source_hash)
+    if not path.exists():
+        return None
+    try:
+        import pyarrow.parquet as pq
+        if columns is not None:
+            available = set(pq.read_schema(path).names)
+            columns = [c for c in columns if c in available]
+        table = pq.read_table(path, columns=columns, memory_map=True)
+        return table.to_pandas()
+    except Exception:
+        return None
+
+def load_or_build(
+    city: str,
+    date: str,
+    sources: Sequence[Optional[Path | str]],
+    build: Callable[[], pd.DataFrame],
+    columns: Optional[Sequence[str]] = ANALYSIS_COLUMNS,
+    source_hash: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Returns the processed snapshot for (city, date, source hash), running `build`
+    (load_data + clean_data) and persisting its result only on a cache miss.
+    Pass `source_hash` when the caller already has file_fingerprint(sources).
+    """
+    source_hash = source_hash or file_fingerprint(sources)
+    df = load_snapshot(city, date, source_hash, columns)
+    if df is not None:
+        return df
+    df = build()
+    try:
+        save_snapshot(df, city, date, source_hash)
+    except Exception:
+        pass  # cache is best-effort (e.g. pyarrow missing)
+    if columns is not None:
+        df = df[[c for c in columns if c in df.columns]]
+    return df
+
+def scored_path(city: str, date: str, source_hash: str) -> Path:
+    return PROCESSED_DIR / f"{city}_{date}_{source_hash}_v{SNAPSHOT_VERSION}_s{SCORED_VERSION}_scored.arrow"
+
+def _shared_table(df: pd.DataFrame):
+    import pyarrow as pa
+    df = _arrow_safe(df)
+    arrays = []
+    for col in df.columns:
+        s = df[col]
+        if isinstance(s.dtype, np.dtype) and s.dtype.kind in "fiub":
+            # NaN kept as a value (not an Arrow null) so the column maps back without a copy
+            arrays.append(pa.array(s.to_numpy(), from_pandas=False))
+        else:
+            arrays.append(pa.Array.from_pandas(s))
+    return pa.Table.from_arrays(arrays, names=[str(c) for c in df.columns])
+
+def publish_scored(df: pd.DataFrame, city: str, date: str, source_hash: str) -> Path:
+    """
+    Writes the analyzed frame as an uncompressed Arrow IPC file that other server
+    processes on this machine attach to with attach_scored() instead of rebuilding it.
+    """
+    import pyarrow as pa
+    path = scored_path(city, date, source_hash)
+    table = _shared_table(df)
+    with atomic_path(path) as tmp:
+        with pa.OSFile(str(tmp), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+    return path
+
+def attach_scored(
+    city: str,
+    date: str,
+    source_hash: str,
+    columns: Optional[Sequence[str]] = None
+) -> Optional[pd.DataFrame]:
+    """
+    Memory-maps a published scored frame. Numeric columns are read-only views of the
+    mapped file (shared page cache, no per-process copy); categoricals come back as
+    small code arrays plus their dictionary, strings are materialized.
+    Returns None when nothing was published or the file is unreadable.
+    """
+    path = scored_path(city, date, source_hash)
+    if not path.exists():
+        return None
+    try:
+        import pyarrow as pa
+        table = pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+        if columns is not None:
+            table = table.select([c for c in columns if c in table.column_names])
+        return table.to_pandas(split_blocks=True)
+    except Exception:
+        return None
@@ -0,0 +1,66 @@
+from __future__ import annotations
+from typing import Tuple
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+EARTH_RADIUS_KM = 6371.0088
+
+class SpatialIndex:
+    """
+    Haversine BallTree plus a latitude-sorted array over a listings frame's
+    latitude/longitude, built once per loaded snapshot. Every query returns
+    row positions (for .iloc) into the frame the index was built from;
+    rows without coordinates are never returned.
+    """
+
+    def __init__(self, df: pd.DataFrame, lat_col: str = "latitude", lon_col: str = "longitude"):
+        if lat_col not in df.columns or lon_col not in df.columns:
+            raise ValueError(f"Spatial index needs '{lat_col}' and '{lon_col}' columns")
+        lat = pd.to_numeric(df[lat_col], errors="coerce").to_numpy(dtype=float)
+        lon = pd.to_numeric(df[lon_col], errors="coerce").to_numpy(dtype=float)
+        valid = np.isfinite(lat) & np.isfinite(lon)
+        self.n_rows = len(df)
+        self.positions = np.flatnonzero(valid)
+        self.lat = lat[valid]
+        self.lon = lon[valid]
+        self._tree = None
+        if len(self.positions):
+            self._tree = BallTree(np.radians(np.column_stack([self.lat, self.lon])), metric="haversine")
+        order = np.argsort(self.lat, kind="stable")
+        self._lat_sorted = self.lat[order]
+        self._lat_order = order
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    @staticmethod
+    def _point(lat: float, lon: float) -> np.ndarray:
+        return np.radians([[lat, lon]])
+
+    def within_radius(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        """Sorted row positions within `radius_km` (great-circle) of the point."""
+        if self._tree is None:
+            return np.empty(0, dtype=np.intp)
+        idx = self._tree.query_radius(self._point(lat, lon), r=radius_km / EARTH_RADIUS_KM)[0]
+        return np.sort(self.positions[idx])
+
+    def nearest(self, lat: float, lon: float, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """Row positions of the k nearest listings and their distances in km, closest first."""
+        k = min(k, len(self.positions))
+        if k <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        dist, idx = self._tree.query(self._point(lat, lon), k=k)
+        return self.positions[idx[0]], dist[0] * EARTH_RADIUS_KM
+
+    def within_bbox(self, south: float, west: float, north: float, east: float) -> np.ndarray:
+        """
+        Sorted row positions inside the box. A box with west > east crosses the
+        antimeridian and wraps around it.
+        """
+        lo = np.searchsorted(self._lat_sorted, south, side="left")
+        hi = np.searchsorted(self._lat_sorted, north, side="right")
+        cand = self._lat_order[lo:hi]
+        lon = self.lon[cand]
+        inside = (lon >= west) & (lon <= east) if west <= east else (lon >= west) | (lon <= east)
+        return np.sort(self.positions[cand[inside]])
@@ -1,3 +1,7 @@
+import os
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
 import pandas as pd
 
 class FileFormatError(Exception):
@@ -9,4 +13,18 @@ def safe_read_listings(path: str) -> pd.DataFrame:
     except Exception as e:
         raise FileFormatError(f"Could not read file: {e}")
     # Add custom validation here if needed
-    return df
\ No newline at end of file
+    return df
+
+@contextmanager
+def atomic_path(path: Path):
+    """
+    Yields a temp path next to `path`, unique per process and call, and moves it over
+    `path` with os.replace when the block succeeds (removed otherwise). Concurrent
+    writers of the same file each write their own temp file; the last replace wins.
+    """
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
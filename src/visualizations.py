@@ -32,9 +32,10 @@ def parallel_recommendations(df, max_recs=6):
     )
     return fig
 
-def radar_for_listing(listing, averages):
+def radar_for_listing(listing, averages, profile=None):
     """
     Compare a listing's main stats against dataset averages using a radar chart.
+    With a DatasetProfile, listing values come from its resolved role columns.
     Returns None if not enough data is available.
     """
     stats = [
@@ -48,6 +49,8 @@ def radar_for_listing(listing, averages):
     for key, label in stats:
         val = listing.get(key)
         avg = averages.get(key)
+        if val is None and profile is not None:
+            val = profile.value(listing, key.replace("avg_", ""))
         if val is None:
             # Try alternate naming in case column names differ
             val = listing.get(key.replace("avg_", ""))
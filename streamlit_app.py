@@ -1,23 +1,39 @@
 import sys
+import hashlib
+import time
 from pathlib import Path
 import pandas as pd
 import streamlit as st
 import plotly.express as px
 
 ROOT = Path(__file__).resolve().parent
+# How long a fetched URL / scraped dataset is reused (across sessions) before Analyze fetches it again.
+REMOTE_SOURCE_TTL_SECONDS = 15 * 60
+# Most common amenities of the loaded dataset offered in the Required Amenities picker.
+AMENITY_PICKER_SIZE = 60
 sys.path.insert(0, str(ROOT))
 sys.path.insert(0, str(ROOT / "src"))
 
 from src.scraper import scrape_catalog
 from src.downloader import download_dataset
-from src.data_preprocessing import load_data, clean_data
-from src.model_training import train_price_model, cluster_hosts
-from src.recommendation import build_recommendation_scores, filter_by_preferences
+from src.data_preprocessing import load_data, clean_data, aggregate_reviews
+from src.snapshot_store import load_or_build, file_fingerprint, attach_scored, publish_scored, ANALYSIS_COLUMNS
+from src.listing_schema import compact_listings, is_insideairbnb_frame
+from src.recommendation import filter_by_preferences, top_k_positions
+from src.pipelines.analysis import run_analysis, plot_sample, ANALYSIS_BUDGET_SECONDS
+from src.pipelines.stages import StageGraph
+from src.dataset_store import DatasetStore, enable_copy_on_write
+from src.pipelines.feature_blocks import BLOCK_SPECS
+from src.pipelines.feature_store import FeatureStore
+from src.pipelines.feedback_profiles import DEFAULT_WEIGHTS, profile_rankings
+from src.pipelines.scoring import ScoreModel
+from src.filter_index import ListingFilterIndex
 from src.visualizations import parallel_recommendations, radar_for_listing
 from src.ui_theme import inject_base_css
 from src.data_sources.direct_csv_url_source import DirectCSVURLSource
 from src.data_sources.external_site_source import ExternalSiteSource
 from src.metrics import compute_metrics
+from src.dataset_profile import build_profile
 
 st.set_page_config(page_title="ProPhet-BnB", layout="wide")
 inject_base_css()
@@ -278,27 +294,14 @@ with st.sidebar:
         st.session_state["demo_mode"] = False
 
     if st.button("Load Example Data", key="demo_btn"):
-        st.session_state["df_base"] = pd.DataFrame({
-            "id": range(1, 11),
-            "name": [f"Demo Home {i}" for i in range(1, 11)],
-            "neighbourhood": ["Downtown", "Uptown", "Central", "Beach", "Suburb", "Park", "Museum", "Old Town", "Lake", "Market"],
-            "room_type": ["Entire home", "Private room", "Shared room", "Entire home", "Private room", "Entire home", "Private room", "Shared room", "Entire home", "Private room"],
-            "price": [120, 80, 45, 200, 90, 130, 60, 30, 170, 100],
-            "review_scores_rating": [4.8, 4.5, 4.2, 4.9, 4.0, 4.7, 4.6, 3.9, 4.8, 4.4],
-            "image_url": ["https://picsum.photos/200/150?random=%d" % i for i in range(1, 11)],
-            "num_reviews": [25, 40, 12, 60, 10, 15, 30, 8, 50, 20],
-            "availability_365": [320, 180, 90, 360, 200, 300, 150, 60, 330, 210],
-            "amenities_count": [12, 8, 6, 15, 7, 10, 5, 4, 13, 9],
-            "total_score": [9.7, 8.2, 7.3, 9.8, 7.8, 8.9, 8.0, 6.7, 9.5, 8.3],
-            "recommendation_reason": ["Great reviews"]*10
-        })
+        st.session_state["source_key"] = ("demo",)
         st.session_state["source_label"] = "Demo Example Data"
         st.session_state["demo_mode"] = True
 
     if source_mode == "InsideAirbnb Snapshot":
         st.markdown("<div class='sidebar-step'>1.1 InsideAirbnb City/Date Picker</div>", unsafe_allow_html=True)
         st.caption("Pick country, region, city, and date.")
-        @st.cache_data(show_spinner=False)
+        @st.cache_data(show_spinner=False, ttl=3600)
         def get_catalog():
             return scrape_catalog()
         try:
@@ -336,24 +339,46 @@ with st.sidebar:
     st.markdown("<div class='sidebar-section-header'>2. Adjust Filters</div>", unsafe_allow_html=True)
     st.caption("Filter listings by price, reviews, ratings, and more.")
     default_filters = {
-        "price_mode": "Budget",
+        "price_mode": "Any",
         "custom_price_range": (0.0, 10000.0),
         "reviews_range": (0, 1000),
         "stars_range": (1.0, 5.0),
         "availability_range": (0, 365),
         "occupancy_group": "Any",
+        "required_amenities": [],
         "suggestions": 6,
-        "map_sample": 2000
+        "map_sample": 2000,
+        "blocks": list(BLOCK_SPECS),
+        "weights": dict(DEFAULT_WEIGHTS)
     }
     uf = st.session_state.get("user_filters", default_filters.copy())
     uf["suggestions"] = st.slider("Suggestions to Show", 3, 10, uf.get("suggestions", 6))
-    uf["price_mode"] = st.radio("Price Band", ["Budget", "Comfort", "Premium", "Custom Range"], index=["Budget","Comfort","Premium","Custom Range"].index(uf.get("price_mode", "Budget")))
+    # "Any" leaves price unrestricted; the bands are the loaded dataset's price terciles
+    uf["price_mode"] = st.radio("Price Band", ["Any", "Budget", "Comfort", "Premium", "Custom Range"], index=["Any","Budget","Comfort","Premium","Custom Range"].index(uf.get("price_mode", "Any")))
     if uf["price_mode"] == "Custom Range":
         uf["custom_price_range"] = st.slider("Custom Price Range [$]", 0.0, 10000.0, uf.get("custom_price_range", (0.0, 10000.0)))
     uf["reviews_range"] = st.slider("Reviews Count", 0, 1000, uf.get("reviews_range", (0, 1000)))
     uf["stars_range"] = st.slider("Rating (Stars)", 1.0, 5.0, uf.get("stars_range", (1.0, 5.0)), 0.5)
     uf["availability_range"] = st.slider("Availability Days", 0, 365, uf.get("availability_range", (0, 365)))
     uf["occupancy_group"] = st.selectbox("Guest Group", ["Any", "Solo (1)", "Duo (2)", "Small group (3-4)", "Family (5-6)", "Large (7+)"], index=["Any","Solo (1)","Duo (2)","Small group (3-4)","Family (5-6)","Large (7+)"].index(uf.get("occupancy_group", "Any")))
+    # ranked from the loaded dataset's amenity index; empty until a dataset with amenities is analyzed
+    amenity_options = st.session_state.get("amenity_options", [])
+    uf["required_amenities"] = st.multiselect(
+        "Required Amenities",
+        amenity_options,
+        default=[a for a in uf.get("required_amenities", []) if a in amenity_options]
+    ) if amenity_options else []
+    uf["blocks"] = st.multiselect(
+        "Score Components",
+        list(BLOCK_SPECS),
+        default=[b for b in uf.get("blocks", list(BLOCK_SPECS)) if b in BLOCK_SPECS],
+        format_func=lambda b: b.replace("_", " ").title()
+    )
+    with st.expander("Score Weights"):
+        weights = dict(DEFAULT_WEIGHTS, **uf.get("weights", {}))
+        uf["weights"] = {
+            k: st.slider(k.title(), 0.0, 2.0, float(weights[k]), 0.1, key=f"weight_{k}") for k in DEFAULT_WEIGHTS
+        }
     st.session_state["user_filters"] = uf
     run_clicked = st.button("Analyze Listings", type="primary")
 
@@ -406,9 +431,6 @@ def find_col(df, names):
                 return col
     return None
 
-def get_numeric_cols(df):
-    return [c for c in df.select_dtypes(include='number').columns if df[c].nunique() > 1]
-
 def get_demo_df():
     return pd.DataFrame({
         "id": range(1, 11),
@@ -426,9 +448,25 @@ def get_demo_df():
     })
 
 df, source_label = None, ""
-max_rows = 10000
+
+def source_key():
+    """Identity of the dataset the Analyze button would load (stage graph root parameter)."""
+    if source_mode == "InsideAirbnb Snapshot":
+        nonce = st.session_state.get("analyze_clicks", 0) if force_download else 0
+        return (source_mode, city, date, custom_url, nonce)
+    if source_mode == "Local CSV Upload":
+        # by content: the store is shared, and two uploads can have the same name and size
+        files = [f for f in (uploaded_listings, uploaded_reviews) if f is not None]
+        return (source_mode, tuple(hashlib.sha256(f.getvalue()).hexdigest() for f in files))
+    # remote sources can change; a click after the TTL window fetches them again
+    fetched = int(time.time() // REMOTE_SOURCE_TTL_SECONDS)
+    if source_mode == "Direct CSV URL":
+        return (source_mode, csv_url, fetched)
+    return (source_mode, site_url, listing_selector, price_selector, name_selector, image_selector, fetched)
 
 def load_dataset():
+    if st.session_state.get("demo_mode", False):
+        return get_demo_df(), {"source_label": "Demo Example Data", "mode": "Demo"}
     if source_mode == "InsideAirbnb Snapshot":
         files = download_dataset(
             version,
@@ -437,13 +475,27 @@ def load_dataset():
             force=force_download,
             override_listings_url=custom_url or None
         )
-        df_local = load_data(files["listings"], files["reviews"], files.get("neighbourhoods"))
-        df_local = clean_data(df_local)
+        source_hash = file_fingerprint([files["listings"], files["reviews"]])
         meta = {
             "source_label": f"{city} {date}",
             "files": files,
-            "mode": "InsideAirbnb"
+            "mode": "InsideAirbnb",
+            "city": city,
+            "date": date,
+            "source_hash": source_hash
         }
+        # another server process may already have analyzed this snapshot
+        df_local = attach_scored(city, date, source_hash)
+        if df_local is not None:
+            meta["scored"] = True
+            return df_local, meta
+        df_local = load_or_build(
+            city,
+            date,
+            [files["listings"], files["reviews"]],
+            lambda: clean_data(load_data(files["listings"], files["reviews"], files.get("neighbourhoods"))),
+            source_hash=source_hash
+        )
         return df_local, meta
     if source_mode == "Local CSV Upload":
         if not uploaded_listings:
@@ -456,9 +508,8 @@ def load_dataset():
             st.stop()
         if uploaded_reviews:
             try:
-                rev_df = pd.read_csv(uploaded_reviews)
-                if "id" in df_local.columns and "listing_id" in rev_df.columns:
-                    summary = rev_df.groupby("listing_id").size().rename("num_reviews")
+                if "id" in df_local.columns:
+                    summary = aggregate_reviews(uploaded_reviews)
                     df_local = df_local.merge(summary, left_on="id", right_index=True, how="left")
             except Exception as e:
                 st.warning(f"Could not read reviews file: {e}")
@@ -492,49 +543,153 @@ def load_dataset():
         return df_local, {"source_label": f"Scraped from {site_url}", "mode": "CustomScraper"}
     raise RuntimeError("Unsupported source mode.")
 
-# ---- DATA LOAD/PROCESS ----
-if run_clicked and not st.session_state.get("demo_mode", False):
-    try:
-        df, meta = load_dataset()
-        source_label = meta.get("source_label", "")
-        if df is None or df.empty:
-            st.error("No data extracted. Please check your upload/site/link or selectors.")
-            st.stop()
-        if len(df) > max_rows:
-            df = df.sample(max_rows)
-            st.warning(f"Sampled {max_rows} rows for performance.")
-        try:
-            _, df = train_price_model(df)
-        except Exception:
-            pass
+# ---- PIPELINE STAGES ----
+# load + analyze (train/cluster/score) -> features -> model, and filter -> metrics, plus
+# profile / filter_index, each memoized in the session on its inputs, so a slider change
+# only reruns "filter" and "metrics", toggling a score component only "features" and
+# "model", and a weight change no stage at all (the model re-ranks in place).
+# The analyzed dataset itself lives in the process-wide store, shared by every session
+# that asks for the same source.
+# Sessions share the stored frames through shallow views, so pandas must copy on write
+# for the whole server process; set here, once, rather than as a library side effect.
+enable_copy_on_write()
+
+@st.cache_resource
+def dataset_store():
+    return DatasetStore()
+
+def load_dataset_checked():
+    df_local, meta = load_dataset()
+    if df_local is None or df_local.empty:
+        st.error("No data extracted. Please check your upload/site/link or selectors.")
+        st.stop()
+    if meta.get("scored"):
+        return df_local, meta  # memory-mapped and already compact
+    # keep only the columns the app uses for InsideAirbnb-shaped data, then downcast / categorize
+    columns = ANALYSIS_COLUMNS if is_insideairbnb_frame(df_local) else None
+    df_local, meta["memory"] = compact_listings(df_local, columns=columns)
+    return df_local, meta
+
+def load_and_analyze():
+    df_local, meta = load_dataset_checked()
+    if meta.get("mode") == "Demo" or meta.get("scored"):
+        return df_local, meta, {}
+    df_local, timings = run_analysis(df_local, city=meta.get("city"), date=meta.get("date"))
+    if meta.get("source_hash"):
         try:
-            _, df = cluster_hosts(df)
+            publish_scored(df_local, meta["city"], meta["date"], meta["source_hash"])
         except Exception:
-            pass
-        df = build_recommendation_scores(df)
-        st.session_state["df_base"] = df
-        st.session_state["source_label"] = source_label
-        st.success(f"Loaded {len(df)} listings.")
+            pass  # sharing with other processes is best-effort
+    return df_local, meta, timings
+
+def stage_analyze(source_key):
+    return dataset_store().acquire(source_key, load_and_analyze)
+
+@st.cache_resource
+def feature_store():
+    return FeatureStore()
+
+def stage_features(analyzed, blocks):
+    return feature_store().compute(analyzed[0], list(blocks)).frame
+
+def stage_model(analyzed, features, blocks):
+    # normalized component matrix; weight changes only redo its product with the weights
+    return ScoreModel.from_frame(analyzed[0], list(blocks), features)
+
+def stage_filter_index(analyzed):
+    return ListingFilterIndex(analyzed[0])
+
+def stage_filter(analyzed, index, profile, filters):
+    df_local = analyzed[0]
+    price_mode, custom_price_range, reviews_range, stars_range, availability_range, occupancy_group, amenities = filters
+    out = filter_by_preferences(
+        df_local,
+        price_range=custom_price_range if price_mode == "Custom Range" else profile.price_bands().get(price_mode),
+        reviews_range=reviews_range,
+        stars_range=stars_range,
+        availability_range=availability_range,
+        occupancy_group=None if occupancy_group == "Any" else occupancy_group,
+        required_amenities=list(amenities) or None,
+        filter_index=index,
+        as_positions=True
+    )
+    return out if len(out) else None
+
+def stage_metrics(analyzed, positions, profile):
+    # the loaded frame's profile covers the unfiltered view; a filtered view profiles its role columns only
+    if positions is None:
+        return compute_metrics(None, profile=profile)
+    filtered = analyzed[0].iloc[positions]
+    return compute_metrics(filtered, profile=build_profile(filtered, columns=[]))
+
+pipeline = StageGraph(st.session_state.setdefault("stage_cache", {}))
+pipeline.add("analyze", stage_analyze, params=["source_key"])
+pipeline.add("filter_index", stage_filter_index, deps=["analyze"])
+pipeline.add("profile", lambda a: build_profile(a[0]), deps=["analyze"])
+pipeline.add("features", stage_features, deps=["analyze"], params=["blocks"])
+pipeline.add("model", stage_model, deps=["analyze", "features"], params=["blocks"])
+pipeline.add("filter", stage_filter, deps=["analyze", "filter_index", "profile"], params=["filters"])
+pipeline.add("metrics", stage_metrics, deps=["analyze", "filter", "profile"])
+
+if run_clicked:
+    st.session_state["analyze_clicks"] = st.session_state.get("analyze_clicks", 0) + 1
+    st.session_state["demo_mode"] = False
+    st.session_state["source_key"] = source_key()
+
+stage_params = {
+    "source_key": st.session_state.get("source_key"),
+    "filters": (
+        uf["price_mode"], tuple(uf.get("custom_price_range", (0.0, 10000.0))), tuple(uf["reviews_range"]),
+        tuple(uf["stars_range"]), tuple(uf["availability_range"]), uf["occupancy_group"],
+        tuple(uf.get("required_amenities", []))
+    ),
+    "blocks": tuple(uf["blocks"]),
+}
+
+df, positions = None, None
+if stage_params["source_key"] is not None:
+    try:
+        df, meta, timings = pipeline.run("analyze", stage_params)
+        model = pipeline.run("model", stage_params)
+        positions = pipeline.run("filter", stage_params)
+        amenity_index = pipeline.run("filter_index", stage_params).amenities
     except Exception as e:
         st.error(f"Could not read or process data: {e}")
         st.stop()
-if st.session_state.get("demo_mode", False):
-    df = st.session_state.get("df_base")
-    source_label = st.session_state.get("source_label", "")
-else:
-    df = st.session_state.get("df_base")
-    source_label = st.session_state.get("source_label", "")
+    source_label = meta.get("source_label", "")
+    st.session_state["df_base"] = df
+    st.session_state["source_label"] = source_label
+    amenity_options = [] if amenity_index is None else list(amenity_index.frequencies(AMENITY_PICKER_SIZE).index)
+    if amenity_options != st.session_state.get("amenity_options", []):
+        # the sidebar was drawn with the previous dataset's picker; redraw it (stages are cached)
+        st.session_state["amenity_options"] = amenity_options
+        st.rerun()
+    if run_clicked:
+        st.success(f"Loaded {len(df)} listings.")
+        if meta.get("memory") is not None:
+            st.caption(f"Memory: {meta['memory']}")
+        if timings:
+            st.caption(
+                "Analysis time: " + ", ".join(f"{k} {v:.2f}s" for k, v in timings.items())
+                + (f" (over the {ANALYSIS_BUDGET_SECONDS:.0f}s budget)" if timings["total"] > ANALYSIS_BUDGET_SECONDS else "")
+            )
+    if positions is None:
+        st.warning("No listings match the current filters; showing all listings.")
+    base_df = df
+    if positions is not None:
+        df = df.iloc[positions]
 
 # ---- CONDITIONAL HERO/RESULT RENDERING ----
 
-if (df is None) or (not run_clicked and not st.session_state.get("demo_mode", False)):
-    # Show the intro/hero block only when NOT analyzing
+if df is None:
+    # Show the intro/hero block only when nothing has been analyzed yet
     show_hero()
 else:
     # Show only results (tabs, main card, etc.)
     st.markdown(f"<div class='main-card'><h2 style='color:#90caf9;'>Source: {source_label}</h2></div>", unsafe_allow_html=True)
 
-    metrics, price_col = compute_metrics(df)
+    profile = pipeline.run("profile", stage_params)
+    metrics, price_col = pipeline.run("metrics", stage_params)
     def fmt(v): return f"{v:,.1f}" if v is not None and pd.notnull(v) else "—"
 
     img_col = find_col(df, ["image_url", "Image", "img", "photo", "picture"])
@@ -574,7 +729,9 @@ else:
         st.markdown("<div class='main-card'>", unsafe_allow_html=True)
         st.subheader("Top Suggested Listings")
         st.caption("Ranked by your selected preferences.")
-        recomm_df = df.sort_values("total_score", ascending=False).head(uf["suggestions"])
+        # weights only reach the score model: one mat-vec product and a top-k over the filtered rows
+        top = model.topk(uf["weights"], uf["suggestions"], mask=positions)
+        recomm_df = base_df.iloc[top].assign(total_score=model.rescore(uf["weights"], rows=top))
         rec_cols = [c for c in ["id", "name", "neighbourhood", "room_type", price_col, "review_scores_rating", img_col] if c in recomm_df.columns]
         st.dataframe(recomm_df[rec_cols], height=400)
         st.download_button(
@@ -583,6 +740,9 @@ else:
             file_name="suggestions.csv",
             mime="text/csv"
         )
+        with st.expander("Rankings by Saved Profile"):
+            rankings = profile_rankings(model, uf["suggestions"], mask=positions)
+            st.dataframe(pd.DataFrame({name: pd.Series(ids) for name, ids in rankings.items()}), height=250)
         st.markdown("#### Most Accurate & Optimized Option")
         best_row = recomm_df.iloc[0]
         info = f"**{best_row.get('name', 'Listing')}**"
@@ -593,7 +753,7 @@ else:
         st.markdown(info)
         if img_col and pd.notnull(best_row[img_col]):
             st.image(best_row[img_col], width=220)
-        radar_fig = radar_for_listing(best_row, metrics)
+        radar_fig = radar_for_listing(best_row, metrics, profile)
         if radar_fig:
             st.plotly_chart(radar_fig, use_container_width=True)
         st.markdown("#### Why is this the best for you?")
@@ -642,7 +802,7 @@ else:
             st.markdown(listing_info)
             if img_col and pd.notnull(rrow[img_col]):
                 st.image(rrow[img_col], width=180)
-            rfig = radar_for_listing(rrow, metrics)
+            rfig = radar_for_listing(rrow, metrics, profile)
             if rfig:
                 st.plotly_chart(rfig, use_container_width=True)
         st.markdown("</div>", unsafe_allow_html=True)
@@ -651,21 +811,22 @@ else:
         st.markdown("<div class='main-card'>", unsafe_allow_html=True)
         st.subheader("3D Scatter Plot")
         st.caption("Explore listings across three dimensions.")
-        numeric_cols = get_numeric_cols(df)
+        numeric_cols = profile.numeric_columns()
         if len(numeric_cols) < 3:
             st.info("Not enough numeric columns for 3D scatter plot.")
         else:
             x_col = st.selectbox("X axis", numeric_cols, index=0, key="3d_x")
             y_col = st.selectbox("Y axis", numeric_cols, index=1 if len(numeric_cols) > 1 else 0, key="3d_y")
             z_col = st.selectbox("Z axis", numeric_cols, index=2 if len(numeric_cols) > 2 else 0, key="3d_z")
+            color_cols = profile.categorical_columns()
             color_col = st.selectbox(
                 "Color by",
-                [c for c in df.columns if df[c].nunique() < 50 and df[c].dtype == object],
+                color_cols,
                 index=0,
                 key="3d_color"
-            ) if any(df[c].nunique() < 50 and df[c].dtype == object for c in df.columns) else None
+            ) if color_cols else None
             fig3d = px.scatter_3d(
-                df,
+                plot_sample(df),
                 x=x_col,
                 y=y_col,
                 z=z_col,
@@ -677,7 +838,7 @@ else:
             )
             st.plotly_chart(fig3d, use_container_width=True)
             st.markdown("### Top Listings Visual Comparison (by 3D scatter plot values)")
-            top_points = df.sort_values([z_col, y_col, x_col], ascending=False).head(3)
+            top_points = df.iloc[top_k_positions(df, 3, by=[z_col, y_col, x_col])]
             img_cols = st.columns(3)
             for idx in range(len(top_points)):
                 row = top_points.iloc[idx]